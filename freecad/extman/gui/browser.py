@@ -24,8 +24,9 @@ from PySide import QtGui, QtCore
 
 from freecad.extman.gui.controller import actions, message_handlers
 from freecad.extman import tr, get_resource_path, get_cache_path, log, log_err
-from freecad.extman.template.html import render
+from freecad.extman.template.html import render, render_stream, DictObject
 from freecad.extman.gui.webview import WebView
+from freecad.extman.utils.worker import Worker, PRIORITY_HIGH
 
 __browser_instance__ = None                         # Singleton: WebView
 __browser_session__ = {}                            # Singleton: State
@@ -52,6 +53,27 @@ class BrowserSession:
     def get_router(self):
         return self.model['route']
 
+    def render_fragment(self, template, selector, mode='inner', **params):
+        """
+        Render template into a fragment for partial page updates.
+        mode: inner (replace content), replace (replace element), append
+        """
+        if isinstance(template, str):
+            template = get_resource_path('html', template)
+        else:
+            template = get_resource_path('html', *template)
+        model = dict(self.model)
+        model['params'] = DictObject(params)
+        html, url = render(template, model=model)
+        return {'selector': selector, 'html': html, 'mode': mode}
+
+    def push_fragments(self, *fragments):
+        """
+        Update page fragments over the MessageBus
+        """
+        if __browser_instance__:
+            __browser_instance__.push_message('extman_updateFragments', fragments=list(fragments))
+
 
 def get_updated_browser_session(**model):
     global __browser_session__, __router__
@@ -103,10 +125,15 @@ class TemplateResponseWrapper:
             template = get_resource_path('html', template)
         else:
             template = get_resource_path('html', *template)
-        html, url = render(template, model=__browser_session__.model)
-        self.delegate.write(html)
         if send:
-            self.delegate.send(content_type)
+            self.delegate.stream(content_type)
+            try:
+                render_stream(template, model=__browser_session__.model, write=self.delegate.write)
+            finally:
+                self.delegate.send(content_type)
+        else:
+            html, url = render(template, model=__browser_session__.model)
+            self.delegate.write(html)
 
     def render(self, content, send=True, content_type='text/html'):
         self.delegate.write(content)
@@ -141,10 +168,17 @@ def request_handler(path, action, params, request, response):
             handler(path, session, params, request, response_wrapper)
 
     # Default action is render template.
+    # Rendered in a worker, chunks are delivered while the rest renders.
     else:
-        html, url = render(path, model=session.model)
-        response.write(html)
-        response.send()
+        response.stream()
+
+        def job():
+            try:
+                render_stream(path, model=session.model, write=response.write)
+            finally:
+                response.send()
+
+        Worker(job).start('ui', PRIORITY_HIGH)
 
 
 def message_handler(message):
@@ -25,12 +25,15 @@ from pathlib import Path
 import json
 from random import randint
 import hashlib
+import traceback
+from html import escape
 
 from freecad.extman import utils, log_err, tr
 from freecad.extman.utils.preferences import ExtManParameters
 from freecad.extman.gui.router import Router, route
+from freecad.extman.sources import InstallResult
 from freecad.extman.sources.source_cloud import findSource, clearSourcesCache
-from freecad.extman.utils.worker import Worker
+from freecad.extman.utils.worker import Worker, PRIORITY_HIGH
 
 
 # +---------------------------------------------------------------------------+
@@ -42,6 +45,20 @@ def restart(path, session, params, request, response):
     utils.restart_freecad()
 
 
+def load_and_render(load, response, template='index.html'):
+    """
+    Run load() in the network executor (catalogues may be downloaded),
+    then render the template in the ui executor, even if load() failed.
+    """
+
+    def render(worker):
+        Worker(response.render_template, template).start('ui', PRIORITY_HIGH)
+
+    loader = Worker(load)
+    loader.addDoneCallback(render)
+    loader.start('network', PRIORITY_HIGH)
+
+
 def show_install_info(path, session, params, request, response):
     """
     Show information before install
@@ -59,9 +76,8 @@ def show_install_info(path, session, params, request, response):
             if install_pkg:
                 session.set_state(pkgSource=pkg_source, pkgName=pkg_name, installPkg=install_pkg)
                 session.route_to('/CloudSources/Packages/Install')
-        response.render_template('index.html')
 
-    Worker(job).start()
+    load_and_render(job, response)
 
 
 def show_uninstall_info(path, session, params, request, response):
@@ -80,7 +96,7 @@ def show_uninstall_info(path, session, params, request, response):
             session.route_to('/CloudSources/Packages/Install')
         response.render_template('index.html')
 
-    Worker(job).start()
+    Worker(job).start('ui', PRIORITY_HIGH)
 
 
 def install_package(path, session, params, request, response):
@@ -94,15 +110,43 @@ def install_package(path, session, params, request, response):
     session.set_state(installResult=None)
 
     def job():
-        pkg_source = findSource(channel_id, source)
-        if pkg_source:
-            install_pkg = pkg_source.findPackageByName(pkg_name)
-            result = pkg_source.install(pkg_name)
-            session.set_state(pkgSource=pkg_source, pkgName=pkg_name, installPkg=install_pkg, installResult=result)
-            session.route_to('/CloudSources/Packages/Install')
+        run_install(session, channel_id, source, pkg_name)
         response.render_template('index.html')
 
-    Worker(job).start()
+    Worker(job).start('network')
+
+
+def run_install(session, channel_id, source, pkg_name):
+    """
+    Install package and update session state
+    """
+
+    pkg_source = findSource(channel_id, source)
+    if pkg_source:
+        install_pkg = pkg_source.findPackageByName(pkg_name)
+        result = pkg_source.install(pkg_name)
+        session.set_state(pkgSource=pkg_source, pkgName=pkg_name, installPkg=install_pkg, installResult=result)
+        session.route_to('/CloudSources/Packages/Install')
+
+
+def run_install_selection(session, channel_id, source, pkg_names):
+    """
+    Install a selection of packages from the same source and update session
+    state with the first failure, or the last package if all succeeded.
+    """
+
+    pkg_source = findSource(channel_id, source)
+    if pkg_source and pkg_names:
+        pkg_source.prefetch(pkg_names)  # Macro code in a few batched requests
+        failed = None
+        for pkg_name in pkg_names:
+            result = pkg_source.install(pkg_name)
+            if failed is None and not (result and result.ok):
+                failed = pkg_name, result
+        pkg_name, result = failed or (pkg_names[-1], result)
+        install_pkg = pkg_source.findPackageByName(pkg_name)
+        session.set_state(pkgSource=pkg_source, pkgName=pkg_name, installPkg=install_pkg, installResult=result)
+        session.route_to('/CloudSources/Packages/Install')
 
 
 def uninstall_package(path, session, params, request, response):
@@ -121,7 +165,7 @@ def uninstall_package(path, session, params, request, response):
         session.route_to('/InstalledPackages')
         response.render_template('index.html')
 
-    Worker(job).start()
+    Worker(job).start('fs')
 
 
 def update_cloud_source(path, session, params, request, response):
@@ -143,11 +187,12 @@ def open_cloud_source(path, session, params, request, response):
 
     def job():
         pkg_source = findSource(params['channel'], params['name'])
+        if pkg_source:
+            pkg_source.getCategories(True)  # Load the catalogue before rendering
         session.set_state(pkgSource=pkg_source)
         session.route_to('/CloudSources/Packages')
-        response.render_template('index.html')
 
-    Worker(job).start()
+    load_and_render(job, response)
 
 
 def open_cloud(path, session, params, request, response):
@@ -260,6 +305,97 @@ def on_form_add_source(data, session):
     return {"status": 'ok'}
 
 
+def on_set_package_viewmode(data, session):
+    """
+    Switch view mode, returns only the package list fragment
+    """
+
+    ExtManParameters.PackagesViewMode = data['vm']
+    if session.get_router().isInstalledPackages():
+        template = ('installed', 'package_list.html')
+    else:
+        template = ('cloud', 'package_list.html')
+    return {'fragments': [session.render_fragment(template, '#extman-package-list')]}
+
+
+def on_load_packages(data, session):
+    """
+    Render the next page of packages of the current cloud source
+    """
+
+    limit = 0 if data.get('all') else ExtManParameters.PackagesPageSize
+    fragment = session.render_fragment(
+        ('cloud', 'package_page.html'),
+        '#extman-more-packages',
+        mode='replace',
+        offset=int(data.get('offset', 0)),
+        limit=limit)
+    return {'fragments': [fragment]}
+
+
+def on_install_package(data, session):
+    """
+    Install/Update package, pushes result fragments when done
+    """
+
+    channel_id = data['channel']
+    source = data['source']
+    pkg_name = data['pkg']
+    session.set_state(installResult=None)
+
+    def job():
+        try:
+            run_install(session, channel_id, source, pkg_name)
+        finally:
+            push_install_fragments(session)
+
+    Worker(job).start('network')
+    return {'status': 'ok'}
+
+
+def on_install_packages(data, session):
+    """
+    Install/Update a selection of packages, pushes result fragments when done
+    """
+
+    channel_id = data['channel']
+    source = data['source']
+    pkg_names = list(data['pkgs'])
+    session.set_state(installResult=None)
+
+    def job():
+        try:
+            run_install_selection(session, channel_id, source, pkg_names)
+        finally:
+            push_install_fragments(session)
+
+    Worker(job).start('network')
+    return {'status': 'ok'}
+
+
+def push_install_fragments(session):
+    """
+    Push install actions and result fragments, if they can not be rendered
+    an error result is pushed instead so the page does not wait forever.
+    """
+
+    fragments = []
+    try:
+        fragments.append(session.render_fragment(('cloud', 'install_actions.html'), '#extman-install-actions'))
+        fragments.append(session.render_fragment(('cloud', 'install_result.html'), '#extman-install-result'))
+    except BaseException as ex:
+        log_err(traceback.format_exc())
+        message = tr('There was an unexpected error while installing this package')
+        # Templates do not escape values, the exception text may contain markup
+        session.set_state(installResult=InstallResult(message=escape('{0}: {1}'.format(message, ex))))
+        try:
+            fragments = [session.render_fragment(('cloud', 'install_result.html'), '#extman-install-result')]
+        except BaseException:
+            log_err(traceback.format_exc())
+            fragments = []  # Still pushed: the page stops waiting
+    session.push_fragments(*fragments)
+
+
 def on_form_remove_source(data, session):
     name = str(hashlib.sha256(data['url'].encode()).hexdigest())
     sources = json.loads(ExtManParameters.CustomCloudSources)
@@ -313,6 +449,10 @@ message_handlers = {
     f.__name__: f
     for f in (
         on_form_add_source,
-        on_form_remove_source
+        on_form_remove_source,
+        on_set_package_viewmode,
+        on_load_packages,
+        on_install_package,
+        on_install_packages
     )
 }
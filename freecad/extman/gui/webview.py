@@ -21,6 +21,7 @@
 
 import json
 import re
+import threading
 from pathlib import Path
 from urllib.parse import unquote
 
@@ -31,26 +32,106 @@ from PySide2.QtWebEngineCore import QWebEngineUrlSchemeHandler
 from PySide2.QtWebEngineWidgets import QWebEngineSettings, QWebEngineView, QWebEnginePage
 
 from freecad.extman import log
+from freecad.extman.utils.worker import run_in_main_thread
 
 EXTMAN_URL_SCHEME = b'extman'                               # extman://...
 WINDOWS_PATH_PATTERN = re.compile(r'^/([a-zA-Z]:.*)')       # /C:... Windows insanity
 ACTION_URL_PATTERN = re.compile(r'.*/action\.(\w+)$')       # action.<name>
 
 
+class StreamDevice(QtCore.QIODevice):
+    """
+    Sequential read only device, fed from any thread while
+    the WebEngine is already reading the reply.
+    Once the request is destroyed, feed and finish are ignored.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.data = bytearray()
+        self.finished = False
+        self.closed = False
+        self.open(QtCore.QIODevice.ReadOnly)
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        with self.lock:
+            return len(self.data) + super().bytesAvailable()
+
+    def atEnd(self):
+        with self.lock:
+            return self.finished and not self.data
+
+    def readData(self, maxlen):
+        with self.lock:
+            chunk = bytes(self.data[:maxlen])
+            del self.data[:maxlen]
+            return chunk
+
+    def writeData(self, data):
+        return -1
+
+    def feed(self, data):
+        with self.lock:
+            if self.closed:
+                return
+            self.data.extend(data)
+        run_in_main_thread(self.notify)
+
+    def finish(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.finished = True
+        run_in_main_thread(self.notify, True)
+
+    def notify(self, finished=False):
+        # Main thread: closed is set there before deleteLater is processed
+        if not self.closed:
+            self.readyRead.emit()
+            if finished:
+                self.readChannelFinished.emit()
+
+    def detach(self):
+        with self.lock:
+            self.closed = True
+            self.data.clear()
+        self.deleteLater()
+
+
 class Response(QtCore.QObject):
 
-    def __init__(self, parent, buffer, request):
+    def __init__(self, parent, buffer, request, stream_device):
         super().__init__(parent=parent)
         self.buffer = buffer
         self.request = request
+        self.stream_device = stream_device
+        self.device = None
 
     def write(self, data):
-        self.buffer.write(data.encode())
+        if self.device:
+            self.device.feed(data.encode())
+        else:
+            self.buffer.write(data.encode())
 
-    def send(self, content_type='text/html'):
-        self.buffer.seek(0)
+    def stream(self, content_type='text/html'):
+        """
+        Reply immediately, following writes are sent as they arrive
+        """
         self.buffer.close()
-        self.request.reply(content_type.encode(), self.buffer)
+        self.device = self.stream_device
+        self.request.reply(content_type.encode(), self.device)
+
+    def send(self, content_type='text/html'):
+        if self.device:
+            self.device.finish()
+        else:
+            self.buffer.seek(0)
+            self.buffer.close()
+            self.request.reply(content_type.encode(), self.buffer)
 
 
 class SchemeHandler(QWebEngineUrlSchemeHandler):
@@ -88,8 +169,12 @@ class SchemeHandler(QWebEngineUrlSchemeHandler):
 
         if path.endswith('.html') or action:
 
+            # Prepare stream device here, in the main thread, stream() is called from workers
+            device = StreamDevice(parent=self)
+            request.destroyed.connect(device.detach)
+
             # Prepare Response object
-            response = Response(self, buf, request)
+            response = Response(self, buf, request, device)
             request.destroyed.connect(response.deleteLater)
 
             # Call handler to do the real work
@@ -142,6 +227,14 @@ class MessageBus(QtCore.QObject):
             response_data['handler'] = request_data.get('handler', 'default_message') + '_response'
             self.message.emit(json.dumps(response_data))
 
+    def push(self, handler, data):
+        """
+        Send unrequested message to Javascript handler, callable from any thread
+        """
+        message = dict(data)
+        message['handler'] = handler
+        run_in_main_thread(self.message.emit, json.dumps(message))
+
 
 class WebView(QtGui.QMdiSubWindow):
 
@@ -199,6 +292,9 @@ class WebView(QtGui.QMdiSubWindow):
     def load(self, url):
         self.webView.load(url)
 
+    def push_message(self, handler, **data):
+        self.messageBus.push(handler, data)
+
 
 def get_supported_mimetype(path):
     name = path.name.lower()
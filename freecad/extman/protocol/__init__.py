@@ -44,5 +44,8 @@ class Protocol:
     def updateMacro(self, pkg):
         pass
 
+    def prefetchMacros(self, pkgs):
+        pass
+
     def getUrl(self):
         pass
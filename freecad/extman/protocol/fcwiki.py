@@ -21,35 +21,36 @@
 # noinspection PyPep8Naming
 
 import FreeCAD as App
+import hashlib
 import json
 import os
 import re
 import sys
 import traceback
-from urllib.parse import quote
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qs
 from pathlib import Path
 
 import freecad.extman.protocol.flags as flags
 import freecad.extman.utils as utils
-from freecad.extman import tr, get_resource_path, get_macro_path
+from freecad.extman import tr, log, get_cache_path, get_resource_path, get_macro_path
 from freecad.extman.protocol import Protocol
 from freecad.extman.protocol.http import http_get
+from freecad.extman.protocol.wiki_store import wiki_store
 from freecad.extman.sources import PackageInfo, InstallResult
+from freecad.extman.utils.cache_basic import use_cache_area
 
-# mediawiki Mod table row
-# Very permissive because mediawiki is very permissive
-MOD_TABLE_ITEM = re.compile(r"""
-        \n\|+-
-        \s+\|+(\[\[(File|Image):(?P<icon>.*?)(\|.*?)\]\])?
-        \s+\|+\[\[(?P<name>.*?)(\|(?P<title>.*?))?\]\]
-        \s+\|+(?P<topics>.*)
-        \s+\|+(?P<description>.*)
-        (\n[^|].*)?
-        \s+\|+(?P<authors>.*)
-        \s+\|+(?P<code>.*)
-        \s+\|+(?P<trash>.*)
-        (\s+\|+(?!-)(?P<flag>.*))?
-    """, re.X | re.I | re.M)
+# Max titles per MediaWiki query (api limit for non bot clients)
+WIKI_BATCH_SIZE = 50
+
+# Increment when parsed page entries change
+WIKI_INDEX_VERSION = 2
+
+# Prefetched wiki pages by (wiki, title)
+use_wiki_page_cache, clear_wiki_page_cache = use_cache_area('wiki_pages')
+
+# mediawiki Mod table row cells:
+# | icon | [[name|title]] | topics | description | authors | code | documentation | flag?
+MOD_TABLE_CELLS = 7
 
 # Macro Metadata from mediawiki
 # * {{MacroLink|Icon=<icon>|Macro <name>/<lang>|Macro <label>}}: <description>
@@ -87,10 +88,6 @@ MACRO_CODE_EXTLINK = re.compile(r"""
     \}\}
     """, re.X | re.S)
 
-# Mediawiki redirect
-REDIRECT = re.compile(r'#REDIRECT\s+\[\[\s*(?P<link>.*?)\s*\]\]')
-
-
 def get_page_content_from_json(jsonObj):
     try:
         return jsonObj['query']['pages'][0]['revisions'][0]['slots']['main']['content']
@@ -98,6 +95,166 @@ def get_page_content_from_json(jsonObj):
         return None
 
 
+def get_page_revid_from_json(jsonObj):
+    try:
+        return jsonObj['query']['pages'][0]['revisions'][0]['revid']
+    except:
+        return None
+
+
+def with_rvprop(url, rvprop):
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    query['rvprop'] = [rvprop]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def get_wiki_index_file(url):
+    return Path(get_cache_path(), 'wiki', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+
+def parse_wiki_page(url, parser):
+    """
+    Returns parser(wikitext) of the page at api url. Parsed entries are stored
+    with the page revid, if it did not change only revision ids are requested.
+    Stored entries are also used if the wiki is not reachable.
+    """
+
+    index_file = get_wiki_index_file(url)
+    cached = None
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') != WIKI_INDEX_VERSION or cached.get('url') != url:
+            cached = None
+    except (OSError, ValueError, AttributeError):
+        cached = None
+
+    if cached:
+        content = http_get(with_rvprop(url, 'ids'), timeout=45, cache=False)
+        if not content:
+            return cached['entries']
+        revid = get_page_revid_from_json(json.loads(content))
+        if revid is not None and revid == cached.get('revid'):
+            return cached['entries']
+
+    content = http_get(with_rvprop(url, 'ids|content'), timeout=45)
+    if not content:
+        return cached['entries'] if cached else None
+
+    data = json.loads(content)
+    entries = parser(get_page_content_from_json(data))
+    revid = get_page_revid_from_json(data)
+    if revid is not None:
+        tmp_file = index_file.with_suffix('.tmp{0}'.format(os.getpid()))
+        try:
+            index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': WIKI_INDEX_VERSION, 'url': url, 'revid': revid, 'entries': entries},
+                          f, separators=(',', ':'))
+            os.replace(str(tmp_file), str(index_file))
+        except (OSError, ValueError) as ex:
+            log('Wiki index not saved:', str(ex))
+    return entries
+
+
+def extract_macro_code(wikitext):
+    """
+    Returns (code, link) of a macro page, code from {{MacroCode}} or legacy
+    <pre> blocks, link from {{Codeextralink}} if there is no code.
+    """
+
+    # Try {{MacroCode ...}}
+    m = MACRO_CODE.search(wikitext)
+    if not m:
+        # Try <pre> ... </pre>
+        m = LEGACY_MACRO_CODE.search(wikitext)
+    if m:
+        return m.group('code'), None
+
+    # Try external source
+    m = MACRO_CODE_EXTLINK.search(wikitext)
+    if m:
+        return None, m.group('link')
+
+    return None, None
+
+
+def parse_macro_links(wikitext, wiki):
+    """
+    Returns macro entries from MacroLink templates
+    """
+
+    links = []
+    for m_link in MACRO_LINK.finditer(wikitext or ''):
+        icon = m_link.group('icon')
+        if icon:
+            icon = wiki + '/Special:Redirect/file/' + icon.replace(' ', '_')
+        links.append({
+            'name': m_link.group('name').replace(' ', '_'),
+            'label': m_link.group('label'),
+            'description': m_link.group('description'),
+            'icon': icon
+        })
+    return links
+
+
+def get_wiki_api_url(wiki, **params):
+    query = dict(action='query', format='json', formatversion=2)
+    query.update(params)
+    return '{0}/api.php?{1}'.format(wiki, urlencode(query))
+
+
+def get_wiki_pages(wiki, titles, content=True):
+    """
+    Fetch the last revision of many pages in batched api calls,
+    redirects are resolved by the server.
+    Returns {title: {'title', 'revid', 'content'}}, None for missing pages.
+    """
+
+    pages = {}
+    titles = list(dict.fromkeys(titles))
+    for i in range(0, len(titles), WIKI_BATCH_SIZE):
+        batch = titles[i:i + WIKI_BATCH_SIZE]
+        found, aliases = {}, {}
+        params = {
+            'prop': 'revisions',
+            'titles': '|'.join(batch),
+            'redirects': 1,
+            'rvslots': '*',
+            'rvprop': 'ids|content' if content else 'ids'
+        }
+        while True:
+            response = http_get(get_wiki_api_url(wiki, **params), timeout=45)
+            if not response:
+                break
+            data = json.loads(response)
+            query = data.get('query', {})
+            for alias in query.get('normalized', []) + query.get('redirects', []):
+                aliases[alias['from']] = alias['to']
+            for page in query.get('pages', []):
+                revisions = page.get('revisions')
+                if revisions:
+                    found[page['title']] = {
+                        'title': page['title'],
+                        'revid': revisions[0].get('revid'),
+                        'content': revisions[0].get('slots', {}).get('main', {}).get('content')
+                    }
+            if 'continue' not in data:
+                break
+            params.update(data['continue'])
+
+        for title in batch:
+            target = title
+            for _ in range(len(aliases)):
+                if target in found or target not in aliases:
+                    break
+                target = aliases[target]
+            pages[title] = found.get(target)
+
+    return pages
+
+
 class FCWikiProtocol(Protocol):
 
     """
@@ -122,22 +279,14 @@ class FCWikiProtocol(Protocol):
         default_icon = utils.path_to_url(get_resource_path('html', 'img', 'package_macro.svg'))
 
         try:
-            content = http_get(self.url, timeout=45)
-            if content:
-                data = json.loads(content)
-                wiki = get_page_content_from_json(data)
+            links = parse_wiki_page(self.url, lambda wikitext: parse_macro_links(wikitext, self.wiki))
+            if links:
+                for link in links:
 
-                for m_link in MACRO_LINK.finditer(wiki):
-
-                    name = m_link.group('name').replace(' ', '_')
-                    label = m_link.group('label')
-                    description = m_link.group('description')
-
-                    icon = m_link.group('icon')
-                    if icon:
-                        icon = self.wiki + '/Special:Redirect/file/' + icon.replace(' ', '_')
-                    else:
-                        icon = default_icon
+                    name = link['name']
+                    label = link['label']
+                    description = link['description']
+                    icon = link['icon'] or default_icon
 
                     pkg = PackageInfo(
                         key=name,
@@ -166,41 +315,57 @@ class FCWikiProtocol(Protocol):
 
         return macros
 
-    def getWikiPageUrlJson(self, name):
-        return '{0}/api.php?action=query&prop=revisions&titles={1}&rvslots=%2A&rvprop=content&formatversion=2&format=json'.format(
-            self.wiki, name)
+    def prefetchMacros(self, pkgs):
+        """
+        Warm up the code of many macros in a few batched api calls
+        """
+
+        titles = ['Macro_{0}'.format(pkg.name) for pkg in pkgs if pkg.isWiki]
+        for title, page in get_wiki_pages(self.wiki, titles).items():
+            if page:
+                _, set_page = use_wiki_page_cache((self.wiki, title))
+                set_page(page)
+
+    def getMacroEntry(self, title):
+        """
+        Returns the stored entry of a macro page at its current revision.
+        Only the revision id is requested if the page is already stored,
+        the stored entry is used as is if the wiki is not reachable.
+        """
+
+        # Prefetched pages are used once
+        page, set_page = use_wiki_page_cache((self.wiki, title))
+        if page:
+            set_page(None)
+        else:
+            entry = wiki_store.lookup(title)
+            if entry:
+                current = get_wiki_pages(self.wiki, [title], content=False).get(title)
+                if current is None or current['revid'] == entry['revid']:
+                    return entry
+            page = get_wiki_pages(self.wiki, [title]).get(title)
+            if not page and entry:
+                return entry
+
+        if page and page['content']:
+            code, link = extract_macro_code(page['content'])
+            return wiki_store.store(title, page['revid'], page['content'], code, link)
 
     def installMacro(self, pkg):
 
         result = InstallResult()
-        url = self.getWikiPageUrlJson("Macro_{0}".format(quote(pkg.name)))
-        content = http_get(url)
-
-        # Manage mediawiki redirects
-        m = REDIRECT.search(content)
-        max_redirects = 3
-        while m:
-            url = self.getWikiPageUrlJson("{0}".format(quote(m.group('link'))))
-            content = http_get(url)
-            m = REDIRECT.search(content)
-            max_redirects -= 1
-            if max_redirects <= 0:
-                break
+        entry = self.getMacroEntry('Macro_{0}'.format(pkg.name))
 
-        if not content:
+        if not entry:
             result.message = tr("""This macro contains invalid content, it cannot be installed directly by the 
                 Extension Manager""")
-        else:
-            wikitext = get_page_content_from_json(json.loads(content))
 
-            # Try {{MacroCode ...}}
-            m = MACRO_CODE.search(wikitext)
-            if not m:
-                # Try <pre> ... </pre>
-                m = LEGACY_MACRO_CODE.search(wikitext)
-
-            # Code in wiki
-            if m:
+        # Code in wiki
+        elif entry['code']:
+            code = wiki_store.readBlob(entry['code'])
+            if code is None:
+                result.message = tr("Macro code could not be read from the local wiki store, please try again")
+            else:
                 try:
                     f = open(pkg.installFile, 'w', encoding='utf-8')
                 except IOError as ex:
@@ -208,47 +373,94 @@ class FCWikiProtocol(Protocol):
                 else:
                     with f:
                         try:
-                            f.write(m.group('code'))
+                            f.write(code)
                             result.ok = True
-                        except:
+                        except (IOError, UnicodeError):
                             result.message = tr("""This macro contains invalid content, 
                                 it cannot be installed directly by the Extension Manager""")
 
-            # Try external source
-            else:
-                m = MACRO_CODE_EXTLINK.search(wikitext)
-                if m:
-                    pre = tr("This macro must be downloaded from this link")
-                    pos = tr("""Copy the link, download it and install it manually 
-                        or follow instructions from the external resource""")
-                    result.message = """{0}: 
-                        <textarea class="form-control" style="min-height: 100px; margin: 5px;" readonly>{1}
-                        </textarea>
-                        {2}""".format(pre, m.group('link'), pos)
+        # Try external source
+        elif entry['link']:
+            pre = tr("This macro must be downloaded from this link")
+            pos = tr("""Copy the link, download it and install it manually 
+                or follow instructions from the external resource""")
+            result.message = """{0}: 
+                <textarea class="form-control" style="min-height: 100px; margin: 5px;" readonly>{1}
+                </textarea>
+                {2}""".format(pre, entry['link'], pos)
 
         return result
 
 
 def get_mod_index(url, wiki):
+    return parse_wiki_page(url, lambda wikitext: parse_mod_index(wikitext, wiki)) or {}
+
+
+def parse_mod_index(wikitext, wiki):
+    """
+    Single pass, line oriented parser of the mediawiki Mod table(s).
+    Very permissive because mediawiki is very permissive: rows start at |-
+    and end at the next |- or |}, cells may be inline (||), lines outside
+    cells are ignored and incomplete rows are skipped.
+    """
+
     index = {}
-    content = http_get(url)
-    if content:
-        data = get_page_content_from_json(json.loads(content))
-        for row in MOD_TABLE_ITEM.finditer(data):
-            repo = row.group('code')
-            if repo.endswith('/'):
-                repo = repo[:-1]
-            item = {
-                'name': row.group('name'),
-                'title': row.group('title') or row.group('name'),
-                'description': row.group('description'),
-                'categories': row.group('topics'),
-                'author': row.group('authors'),
-                'repo': repo,
-                'flag': row.group('flag')
-            }
-            icon = row.group('icon')
-            if icon:
-                item['icon'] = wiki + '/Special:Redirect/file/' + icon.replace(' ', '_')
-            index[repo] = item
+    cells = None
+    for line in (wikitext or '').split('\n'):
+        text = line.strip()
+        if text[:1] != '|':
+            continue
+        text = text.lstrip('|')
+        mark = text[:1]
+        if mark == '-' or mark == '}':
+            add_mod_index_row(index, cells, wiki)
+            cells = [] if mark == '-' else None
+        elif cells is not None and len(cells) <= MOD_TABLE_CELLS:
+            if '||' in text:
+                cells.extend(cell.strip() for cell in text.split('||'))
+            else:
+                cells.append(text.strip())
+    add_mod_index_row(index, cells, wiki)
     return index
+
+
+def parse_wiki_link(text):
+    """
+    Returns (target, label) of [[target|label]], label is None if missing
+    """
+
+    if text.startswith('[['):
+        end = text.find(']]')
+        if end > 0:
+            target, sep, label = text[2:end].partition('|')
+            return target, label if sep else None
+    return None, None
+
+
+def add_mod_index_row(index, cells, wiki):
+    if not cells or len(cells) < MOD_TABLE_CELLS:
+        return
+
+    name, title = parse_wiki_link(cells[1])
+    if name is None:
+        return
+
+    repo = cells[5]
+    if repo.endswith('/'):
+        repo = repo[:-1]
+    item = {
+        'name': name,
+        'title': title or name,
+        'description': cells[3],
+        'categories': cells[2],
+        'author': cells[4],
+        'repo': repo,
+        'flag': cells[MOD_TABLE_CELLS] if len(cells) > MOD_TABLE_CELLS else None
+    }
+
+    icon, _ = parse_wiki_link(cells[0])
+    if icon:
+        prefix, sep, icon = icon.partition(':')
+        if sep and prefix.strip().lower() in ('file', 'image'):
+            item['icon'] = wiki + '/Special:Redirect/file/' + icon.replace(' ', '_')
+    index[repo] = item
@@ -20,10 +20,12 @@
 # ***************************************************************************
 # noinspection PyPep8Naming
 
+import functools
 import os
 import re
 import sys
 import tempfile
+import time
 import traceback
 from distutils.version import StrictVersion
 from shutil import which
@@ -39,14 +41,17 @@ import freecad.extman.protocol.fcwiki as fcw
 import freecad.extman.protocol.zip as zlib
 from freecad.extman import tr, log, get_cache_path, get_macro_path, get_mod_path
 from freecad.extman import utils
-from freecad.extman.protocol.macro_parser import build_macro_package
+from freecad.extman.protocol.macro_index import get_macro_index, MISSING
+from freecad.extman.protocol.macro_parser import build_macro_package, read_macro_tags_batch, read_macro_tags_cached
 from freecad.extman.protocol import Protocol, flags
 from freecad.extman.protocol.http import http_get, http_download
 from freecad.extman.sources import PackageInfo, InstallResult
-from freecad.extman.utils.worker import Worker
+from freecad.extman.utils.worker import Worker, as_completed, wait_all, PRIORITY_LOW
 
 
 MIN_VERSION = StrictVersion('2.14.99')
+SPARSE_MIN_VERSION = StrictVersion('2.25.0')  # Reliable partial clone + sparse checkout
+MACRO_SPARSE_PATTERNS = ['*.FCMacro', '*.fcmacro']
 DISABLE_GIT = False
 
 
@@ -142,17 +147,41 @@ class GitProtocol(Protocol):
         if self.indexType == 'wiki' and self.indexUrl and self.wikiUrl:
             index = fcw.get_mod_index(self.indexUrl, self.wikiUrl)
 
+        sync_manifest = pref.ExtManParameters.SyncModManifests
+        sync_readme = pref.ExtManParameters.SyncModReadmes
+
         # Get modules
         if self.submodulesUrl:
             modules = get_submodules(self.submodulesUrl)
-            return [self.modFromSubModule(mod, index) for mod in modules]
+            repos = self.fetchMetadata(modules, sync_manifest, sync_readme)
+            return [self.modFromSubModule(mod, index, repo=repo) for mod, repo in zip(modules, repos)]
         else:
             mod = self.repo.asModule()
             if mod:
-                return [self.modFromSubModule(mod, index)]
+                return [self.modFromSubModule(mod, index, sync_manifest, sync_readme)]
             else:
                 return []
 
+    def fetchMetadata(self, modules, syncManifest, syncReadme):
+        """
+        Returns a repo per module with manifest/readme fetched concurrently,
+        requests per host are limited by the http pool.
+        Fetches run in their own executor: callers usually run on 'network'
+        and would deadlock waiting for queued workers behind them.
+        """
+
+        repos = [self.RepoImpl(mod['url']) for mod in modules]
+        workers = []
+        for repo in repos:
+            if syncManifest:
+                workers.append(Worker(repo.syncManifestHttp).start('metadata'))
+            if syncReadme:
+                workers.append(Worker(repo.syncReadmeHttp).start('metadata'))
+        for worker in as_completed(workers):
+            if worker.error:
+                log(tr('Metadata fetch failed: {0}').format(worker.error))
+        return repos
+
     def downloadMacroList(self):
 
         local_dir = Path(
@@ -164,6 +193,14 @@ class GitProtocol(Protocol):
         # Try Git
         (gitAvailable, gitExe, gitVersion, gitPython, gitVersionOk) = install_info()
         if gitAvailable and gitPython and gitVersionOk:
+
+            # First listing: blobless clone with only macro files checked out
+            if pref.ExtManParameters.GitSparseMacros and gitVersion >= SPARSE_MIN_VERSION \
+                    and not Path(local_dir, '.git').exists():
+                repo, path = clone_sparse(self.url, local_dir, MACRO_SPARSE_PATTERNS)
+                if path:
+                    return path
+
             repo, path = clone_local(self.url, path=local_dir)
             return path
 
@@ -187,31 +224,53 @@ class GitProtocol(Protocol):
         macros = []
         path = self.downloadMacroList()
         if path:
+            entries = [entry for entry in path.glob('**/*')
+                       if '.git' not in entry.name.lower() and entry.name.lower().endswith('.fcmacro')]
+
+            # Unchanged files are served by the macro index
+            index = get_macro_index()
+            tags_list = [index.lookup(entry) for entry in entries]
+            missing = [i for i, tags in enumerate(tags_list) if tags is MISSING]
+
+            # Large repositories: extract tags in worker processes
+            threshold = pref.ExtManParameters.MacroParseProcessThreshold
+            if 0 < threshold <= len(missing):
+                batch = read_macro_tags_batch([entries[i] for i in missing])
+                if batch is not None:
+                    for i, tags in zip(missing, batch):
+                        tags_list[i] = tags
+                        index.store(entries[i], tags)
+                    missing = []
+
             workers = []
-            for entry in path.glob('**/*'):
-                if '.git' in entry.name.lower():
-                    continue
-                if entry.name.lower().endswith('.fcmacro'):
-                    worker = Worker(build_macro_package,
-                                    entry,
-                                    entry.stem,
-                                    is_git=True,
-                                    install_path=Path(install_dir, entry.name),
-                                    base_path=entry.relative_to(path).parent)
-                    worker.start()
-                    workers.append(worker)
-            macros = [flags.apply_predefined_flags(w.get()) for w in workers]
+            for i in missing:
+                worker = Worker(read_macro_tags_cached, entries[i])
+                worker.start('cpu', PRIORITY_LOW)
+                workers.append(worker)
+            for i, tags in zip(missing, wait_all(workers)):
+                tags_list[i] = tags
+            index.save()
+
+            for entry, tags in zip(entries, tags_list):
+                macro = build_macro_package(entry,
+                                            entry.stem,
+                                            is_git=True,
+                                            install_path=Path(install_dir, entry.name),
+                                            base_path=entry.relative_to(path).parent,
+                                            tags=tags)
+                macros.append(flags.apply_predefined_flags(macro))
         return macros
 
-    def modFromSubModule(self, mod, index, syncManifest=False, syncReadme=False):
+    def modFromSubModule(self, mod, index, syncManifest=False, syncReadme=False, repo=None):
 
-        repo = self.RepoImpl(mod['url'])
+        if repo is None:
+            repo = self.RepoImpl(mod['url'])
 
-        if syncManifest:
-            repo.syncManifestHttp()
+            if syncManifest:
+                repo.syncManifestHttp()
 
-        if syncReadme:
-            repo.syncReadmeHttp()
+            if syncReadme:
+                repo.syncReadmeHttp()
 
         icon_path = "resources/icons/{0}.svg".format(mod['name'])
 
@@ -453,6 +512,11 @@ class GitProtocol(Protocol):
         # Ensure last version if available locally
         src_dir = self.downloadMacroList()
 
+        # Sparse clone: fetch macro files on demand
+        if src_dir and pkg.files:
+            paths = [utils.path_relative(f) for f in pkg.files]
+            checkout_sparse_paths(src_dir, [Path(pkg.basePath, p) for p in paths if p])
+
         # Get path of source macro file
         src_file = Path(src_dir, pkg.basePath, pkg.installFile.name)
 
@@ -548,6 +612,7 @@ def get_submodules(url):
         return []
 
 
+@functools.lru_cache()
 def install_info():
     """
     Returns info about git (installed, executable, version, pygit, git_version_check)
@@ -556,11 +621,14 @@ def install_info():
         version: StrictVersion
         pygit: GitPython module
         git_version_check: bool
+    Probed once per session, see refresh_install_info.
     """
 
     if DISABLE_GIT:
         return False, None, None, None, False
 
+    start = time.perf_counter()
+
     # Find git executable
     executable = which('git')
 
@@ -585,9 +653,18 @@ def install_info():
 
     installed = bool(version)
     git_version_check = (version and version >= MIN_VERSION)
+    log('Git probe: {0} ({1}), GitPython: {2}, {3:.1f}ms'.format(
+        executable, version, bool(git), (time.perf_counter() - start) * 1000))
     return installed, executable, version, git, git_version_check
 
 
+def refresh_install_info():
+    """Probe git again, ie. after it was installed or DISABLE_GIT changed"""
+
+    install_info.cache_clear()
+    return install_info()
+
+
 def update_local(path):
     # Get git
     (gitAvailable, executable, version, pygit, gitVersionOk) = install_info()
@@ -599,9 +676,10 @@ def update_local(path):
             repo = pygit.Repo(path)
             repo.head.reset('--hard')
 
-            # Pull
+            # Move to the last remote commit, shallow histories can not be merged
             repo = pygit.Git(path)
-            repo.pull('--depth=1')
+            repo.fetch('--depth=1', 'origin')
+            repo.reset('--hard', 'FETCH_HEAD')
             repo = pygit.Repo(path)
             for submodule in repo.submodules:
                 submodule.update(init=True, recursive=True)
@@ -648,6 +726,63 @@ def clone_local(repo_url, path=None, **kwargs):
     return None, None
 
 
+def clone_sparse(repo_url, path, patterns):
+    """
+    Blobless partial clone with only files matching patterns (gitignore syntax)
+    checked out. Other blobs are fetched by git when checked out later.
+    """
+
+    (gitAvailable, executable, version, pygit, gitVersionOk) = install_info()
+
+    if gitAvailable and pygit and gitVersionOk:
+        try:
+            repo = pygit.Repo.clone_from(repo_url, path, depth=1, filter='blob:none', no_checkout=True)
+            set_sparse_patterns(repo, patterns)
+            return repo, path
+        except:
+            traceback.print_exc(file=sys.stderr)
+            shutil.rmtree(path, True)
+
+    return None, None
+
+
+def set_sparse_patterns(repo, patterns):
+    """
+    Add patterns to the sparse checkout of repo and update the working tree,
+    missing blobs of a partial clone are fetched in one batch.
+    """
+
+    sparse_file = Path(repo.git_dir, 'info', 'sparse-checkout')
+    current = []
+    if sparse_file.exists():
+        with open(sparse_file, 'r', encoding='utf-8') as f:
+            current = [line.strip() for line in f if line.strip()]
+    else:
+        config_set(repo, 'core', 'sparseCheckout', 'true')
+        config_set(repo, 'core', 'sparseCheckoutCone', 'false')
+        sparse_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(sparse_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(dict.fromkeys(current + patterns)) + '\n')
+    repo.git.read_tree('-mu', 'HEAD')
+
+
+def checkout_sparse_paths(path, paths):
+    """
+    Checkout paths (relative) in a sparse clone, noop for full clones
+    """
+
+    (gitAvailable, executable, version, pygit, gitVersionOk) = install_info()
+
+    if pygit and Path(path, '.git', 'info', 'sparse-checkout').exists():
+        patterns = ['/' + Path(p).as_posix() for p in paths]
+        if patterns:
+            try:
+                set_sparse_patterns(pygit.Repo(path), patterns)
+            except:
+                traceback.print_exc(file=sys.stderr)
+
+
 def config_set(pyGitRepo, section, option, value):
     cw = None
     try:
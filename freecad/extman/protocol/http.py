@@ -19,18 +19,19 @@
 # *                                                                         *
 # ***************************************************************************
 
+import base64
+import http.client as client
+import threading
+import time
 import traceback
-import urllib.error as errors
 import urllib.request as request
+from urllib.parse import urljoin, urlsplit
 
 from freecad.extman import log
+from freecad.extman.protocol.http_cache import http_cache
 from freecad.extman.utils.preferences import ExtManParameters
 
-# <Start Legacy urllib code>
-#   Can be replaced by modern request lib but
-#   I leave it with urllib to avoid dependency problems
 ssl_ctx = None
-request_initialized = False
 
 try:
     import ssl
@@ -42,8 +43,13 @@ else:
     except AttributeError:
         pass
 
+USER_AGENT = 'FreeCAD-ExtMan'
 
-def get_proxy_conf():
+# Errors of a reused keep-alive connection closed by the server
+STALE_CONNECTION_ERRORS = (client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+def get_proxies():
     proxy_check = ExtManParameters.ProxyCheck
     if proxy_check == 'system':
         proxy = request.getproxies()
@@ -53,47 +59,278 @@ def get_proxy_conf():
         proxies = {"http": proxy, "https": proxy}
     else:
         proxies = {}
-    return request.ProxyHandler(proxies)
+    return proxies
 
 
-def get_ssh_handler():
-    if ssl_ctx:
-        return request.HTTPSHandler(context=ssl_ctx)
-    else:
-        return {}
+def get_proxy_conf():
+    return request.ProxyHandler(get_proxies())
+
+
+def get_proxy_for(scheme, host):
+    proxy = get_proxies().get(scheme)
+    if proxy and ExtManParameters.ProxyCheck == 'system' and request.proxy_bypass(host):
+        return None
+    return proxy or None
+
+
+class HttpError(Exception):
+
+    def __init__(self, url, status, reason):
+        super().__init__('HTTP {0} {1}'.format(status, reason))
+        self.url = url
+        self.status = status
+        self.reason = reason
+
+
+class PooledResponse:
+    """
+    Response of HttpPool.open, returns the connection to the pool on close
+    if the body was fully read.
+    """
+
+    def __init__(self, pool, key, conn, response, url):
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+        self.slot = None  # Host concurrency slot, released on close
+
+    def read(self, amt=None):
+        return self.response.read(amt)
+
+    def readinto(self, buffer):
+        return self.response.readinto(buffer)
+
+    def close(self):
+        slot, self.slot = self.slot, None
+        if slot:
+            slot.release()
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        response = self.response
+        if not response.isclosed() and response.length == 0:
+            response.read()
+        if response.isclosed() and not response.will_close:
+            self.pool.release(self.key, conn)
+        else:
+            response.close()
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
-def urllib_init():
-    global request_initialized
-    if not request_initialized:
-        proxy_support = get_proxy_conf()
-        handler = get_ssh_handler()
-        opener = request.build_opener(proxy_support, handler)
-        request.install_opener(opener)
-        request_initialized = True
+class HttpPool:
+    """
+    Keep-alive http(s) connections per (scheme, host, port, proxy).
+    Concurrent requests per host are limited by HttpHostConcurrency.
+    """
 
+    def __init__(self, max_idle_per_host=4, idle_timeout=60, max_redirects=8):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.max_redirects = max_redirects
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.host_slots = {}
+        self.host_waits = 0
+        self.requests = 0
+        self.created = 0
+        self.reused = 0
+        self.retries = 0
+        self.redirects = 0
+        self.errors = 0
 
-# <End Legacy urllib code>
+    def connect(self, scheme, host, port, proxy, timeout):
+        if proxy:
+            p = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            headers = {}
+            if p.username:
+                credentials = '{0}:{1}'.format(p.username, p.password or '')
+                headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+            proxy_port = p.port or (443 if p.scheme == 'https' else 80)
+            if scheme == 'https':
+                # CONNECT tunnel, TLS is negotiated with the target host through it
+                conn = client.HTTPSConnection(p.hostname, proxy_port, timeout=timeout, context=ssl_ctx)
+                conn.set_tunnel(host, port, headers=headers)
+            elif p.scheme == 'https':
+                conn = client.HTTPSConnection(p.hostname, proxy_port, timeout=timeout, context=ssl_ctx)
+                conn.proxy_headers = headers
+            else:
+                conn = client.HTTPConnection(p.hostname, proxy_port, timeout=timeout)
+                conn.proxy_headers = headers
+        elif scheme == 'https':
+            conn = client.HTTPSConnection(host, port, timeout=timeout, context=ssl_ctx)
+        else:
+            conn = client.HTTPConnection(host, port, timeout=timeout)
+        with self.lock:
+            self.created += 1
+        return conn
+
+    def acquire(self, key, timeout):
+        """Returns (connection, reused)"""
+
+        now = time.monotonic()
+        with self.lock:
+            idle = self.idle.get(key)
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    self.reused += 1
+                    conn.timeout = timeout
+                    if conn.sock:
+                        conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        scheme, host, port, proxy = key
+        return self.connect(scheme, host, port, proxy, timeout), False
+
+    def getHostSlot(self, host):
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(max(ExtManParameters.HttpHostConcurrency, 1))
+                self.host_slots[host] = slot
+            return slot
+
+    def release(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def send(self, method, url, headers, timeout):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError('Unsupported url: {0}'.format(url))
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        proxy = get_proxy_for(scheme, host)
+        key = (scheme, host, port, proxy)
+
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        all_headers = {'User-Agent': USER_AGENT}
+        if proxy and scheme == 'http':
+            target = url
+        all_headers.update(headers or {})
+
+        conn, reused = self.acquire(key, timeout)
+        while True:
+            try:
+                if proxy and scheme == 'http':
+                    all_headers.update(conn.proxy_headers)
+                conn.request(method, target, headers=all_headers)
+                return PooledResponse(self, key, conn, conn.getresponse(), url)
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                with self.lock:
+                    self.retries += 1
+                conn, reused = self.connect(scheme, host, port, proxy, timeout), False
+            except BaseException:
+                conn.close()
+                raise
+
+    def open(self, url, headers=None, timeout=30, method='GET'):
+        """
+        Returns PooledResponse (use as context manager) following redirects,
+        raises HttpError if status >= 400
+        """
+
+        with self.lock:
+            self.requests += 1
+        slot = self.getHostSlot(urlsplit(url).hostname)
+        if not slot.acquire(blocking=False):
+            with self.lock:
+                self.host_waits += 1
+            slot.acquire()
+        try:
+            for _ in range(self.max_redirects + 1):
+                response = self.send(method, url, headers, timeout)
+                location = response.headers.get('Location')
+                if response.status in (301, 302, 303, 307, 308) and location:
+                    response.read()
+                    response.close()
+                    url = urljoin(url, location)
+                    if response.status == 303 and method != 'HEAD':
+                        method = 'GET'
+                    with self.lock:
+                        self.redirects += 1
+                    continue
+                if response.status >= 400:
+                    response.close()
+                    raise HttpError(url, response.status, response.response.reason)
+                response.slot = slot
+                return response
+            raise HttpError(url, 310, 'Too many redirects')
+        except BaseException:
+            slot.release()
+            with self.lock:
+                self.errors += 1
+            raise
+
+    def clear(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'connectionsCreated': self.created,
+                'connectionsReused': self.reused,
+                'retries': self.retries,
+                'redirects': self.redirects,
+                'errors': self.errors,
+                'hostWaits': self.host_waits,
+                'idle': {'{0}://{1}:{2}'.format(*key[:3]): len(conns) for key, conns in self.idle.items() if conns},
+            }
+
+
+http_pool = HttpPool()
+
+
+def http_get(url, headers=None, timeout=30, decode='utf-8', cache=True):
+    """
+    Returns body as str decoded once with `decode` encoding,
+    as bytes if decode is None, None on errors.
+    If cache is True, cached bodies are revalidated (ETag/Last-Modified)
+    and served from disk on 304.
+    """
 
-def http_get(url, headers=None, timeout=30, decode='utf-8'):
-    urllib_init()
     data = None
     try:
-        with request.urlopen(request.Request(url, headers=headers or {}), timeout=timeout) as f:
-            block = 8192
-            if decode:
-                data = ''
-            else:
-                data = []
-            while True:
-                p = f.read(block)
-                if not p:
-                    break
-                if isinstance(p, bytes) and decode:
-                    p = p.decode(decode)
-                data += p
-    except errors.URLError as ex:
-        log(url, str(ex.reason))
+        request_headers = dict(headers or {})
+        if cache:
+            request_headers.update(http_cache.getValidators(url))
+        with http_pool.open(url, request_headers, timeout) as f:
+            body = f.read()  # To EOF: single buffer (Content-Length) or joined chunks
+            if f.status == 304:
+                body = http_cache.read(url)
+            elif cache:
+                http_cache.store(url, f.headers, body)
+        # Cached body lost after 304: retry once the host slot is released
+        if body is None:
+            return http_get(url, headers, timeout, decode, cache=False)
+        data = body.decode(decode) if decode else body
+    except (HttpError, OSError, client.HTTPException, UnicodeDecodeError) as ex:
+        log(url, str(ex))
     except:
         log(traceback.format_exc())
 
@@ -101,9 +338,8 @@ def http_get(url, headers=None, timeout=30, decode='utf-8'):
 
 
 def http_download(url, path, headers=None, timeout=30):
-    urllib_init()
     try:
-        with request.urlopen(request.Request(url, headers=headers or {}), timeout=timeout) as stream:
+        with http_pool.open(url, headers, timeout) as stream:
             with open(path, 'wb') as localFile:
                 block = 8192
                 while True:
@@ -112,8 +348,8 @@ def http_download(url, path, headers=None, timeout=30):
                         break
                     localFile.write(p)
                 return True
-    except errors.URLError as ex:
-        log(url, str(ex.reason))
+    except (HttpError, OSError, client.HTTPException) as ex:
+        log(url, str(ex))
     except:
         log(traceback.format_exc())
 
@@ -121,12 +357,8 @@ def http_download(url, path, headers=None, timeout=30):
 
 
 def http_url_exists(url, timeout=30):
-    urllib_init()
     try:
-        req = request.Request(url, timeout=timeout)
-        req.get_method = lambda: 'HEAD'
-        request.urlopen(req)
+        with http_pool.open(url, timeout=timeout, method='HEAD'):
+            return True
     except:
         return False
-    else:
-        return True
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from freecad.extman import get_cache_path, log
+from freecad.extman.utils.preferences import ExtManParameters
+
+
+class HttpCache:
+    """
+    On disk cache of http bodies with their validators (ETag, Last-Modified).
+    Entries are revalidated on every use. The meta file mtime is the
+    last access time used for LRU eviction.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.size = None  # Estimated total size, None until first scan
+
+    def getEntryPaths(self, url):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return Path(self.path, name + '.json'), Path(self.path, name + '.body')
+
+    def getValidators(self, url):
+        """Returns conditional request headers for url, empty if not cached"""
+
+        meta_file, body_file = self.getEntryPaths(url)
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if meta.get('url') != url or not body_file.exists():
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('lastModified'):
+            headers['If-Modified-Since'] = meta['lastModified']
+        return headers
+
+    def read(self, url):
+        """Returns cached body (bytes) after a 304, None if lost meanwhile"""
+
+        meta_file, body_file = self.getEntryPaths(url)
+        try:
+            with open(body_file, 'rb') as f:
+                body = f.read()
+            os.utime(meta_file)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return body
+
+    def store(self, url, headers, body):
+        """Store body if response has validators and allows storage"""
+
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in (headers.get('Cache-Control') or ''):
+            return
+        meta = {'url': url, 'etag': etag, 'lastModified': last_modified, 'size': len(body)}
+        meta_file, body_file = self.getEntryPaths(url)
+        suffix = '.tmp{0}.{1}'.format(os.getpid(), threading.get_ident())
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(str(body_file) + suffix, 'wb') as f:
+                f.write(body)
+            with open(str(meta_file) + suffix, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(str(body_file) + suffix, str(body_file))
+            os.replace(str(meta_file) + suffix, str(meta_file))
+        except OSError as ex:
+            log('Http cache entry not saved:', url, str(ex))
+            return
+        with self.lock:
+            self.stored += 1
+            if self.size is not None:
+                self.size += len(body)
+        self.evict()
+
+    def evict(self, max_size=None):
+        """Remove least recently used entries until total size <= max_size"""
+
+        if max_size is None:
+            max_size = ExtManParameters.HttpCacheSize * 1024 * 1024
+        with self.lock:
+            if self.size is not None and self.size <= max_size:
+                return
+            entries = []
+            total = 0
+            try:
+                for meta_file in self.path.glob('*.json'):
+                    body_file = meta_file.with_suffix('.body')
+                    try:
+                        size = body_file.stat().st_size
+                        mtime = meta_file.stat().st_mtime
+                    except OSError:
+                        continue
+                    entries.append((mtime, size, meta_file, body_file))
+                    total += size
+            except OSError:
+                return
+            self.size = total
+            if total <= max_size:
+                return
+            entries.sort(key=lambda e: e[0])
+            for _, size, meta_file, body_file in entries:
+                if total <= max_size:
+                    break
+                for file in (meta_file, body_file):
+                    try:
+                        file.unlink()
+                    except OSError:
+                        pass
+                total -= size
+                self.evicted += 1
+            self.size = total
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'stored': self.stored, 'evicted': self.evicted}
+
+
+http_cache = HttpCache(Path(get_cache_path(), 'http'))
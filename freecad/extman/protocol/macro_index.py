@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from freecad.extman import get_cache_path, log
+
+# Increment when the stored tags change
+MACRO_INDEX_VERSION = 2
+
+# Returned by lookup if path is not indexed or changed
+MISSING = object()
+
+
+def get_file_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MacroIndex:
+    """
+    Persistent tags of macro files by path, validated by (size, mtime).
+    If only mtime changed (ie. git checkout) the content hash is compared.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            if self.entries is None:
+                self.entries = {}
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get('version') == MACRO_INDEX_VERSION:
+                        self.entries = data['entries']
+                except (OSError, ValueError, AttributeError, KeyError):
+                    pass
+            return self.entries
+
+    def lookup(self, path):
+        """Returns cached tags (None if not decodable) or MISSING"""
+
+        key = str(path)
+        entry = self.load().get(key)
+        if entry is None:
+            return MISSING
+
+        size, mtime, digest, tags = entry
+        try:
+            stat = os.stat(path)
+            if stat.st_size != size:
+                return MISSING
+            if stat.st_mtime_ns != mtime:
+                if get_file_digest(path) != digest:
+                    return MISSING
+                with self.lock:
+                    self.entries[key] = [size, stat.st_mtime_ns, digest, tags]
+                    self.dirty = True
+        except OSError:
+            return MISSING
+        return tags
+
+    def store(self, path, tags):
+        try:
+            stat = os.stat(path)
+            entry = [stat.st_size, stat.st_mtime_ns, get_file_digest(path), tags]
+        except OSError:
+            return
+        self.load()
+        with self.lock:
+            self.entries[str(path)] = entry
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_file = Path(self.path).with_suffix('.tmp{0}'.format(os.getpid()))
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({'version': MACRO_INDEX_VERSION, 'entries': self.entries}, f, separators=(',', ':'))
+                os.replace(str(tmp_file), str(self.path))
+                self.dirty = False
+            except (OSError, ValueError) as ex:
+                log('Macro index not saved:', str(ex))
+
+
+__MACRO_INDEX__ = None
+__MACRO_INDEX_LOCK__ = threading.Lock()
+
+
+def get_macro_index():
+    global __MACRO_INDEX__
+    with __MACRO_INDEX_LOCK__:
+        if __MACRO_INDEX__ is None:
+            __MACRO_INDEX__ = MacroIndex(Path(get_cache_path(), 'macro_index.json'))
+        return __MACRO_INDEX__
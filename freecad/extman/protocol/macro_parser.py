@@ -26,105 +26,112 @@ from pathlib import Path
 
 import freecad.extman.utils as utils
 from freecad.extman import get_resource_path, tr, log_err, get_macro_path
+from freecad.extman.protocol.macro_index import get_macro_index, MISSING
+from freecad.extman.protocol.macro_tags import MACRO_TAG_FILTER, read_macro_tags
 from freecad.extman.sources import PackageInfo
-
-# Regex for tags __tag__ = value
-MACRO_TAG_PATTERN = re.compile(r'''
-    ^\s*
-    __(?P<tag>\w+?)__
-    \s*=\s*
-    (
-        ( (?P<sq>\'|\'{3}) (?P<svalue>[^\']+?) (?P=sq) )
-        |
-        ( (?P<dq>"|"{3})   (?P<dvalue>[^"]+?) (?P=dq) )
-    )
-    ''',
-                               re.I | re.S | re.M | re.X)
-
-# Allowed tags (Constant)
-MACRO_TAG_FILTER = [
-    'name', 'title', 'author', 'version', 'date', 'comment',
-    'web', 'wiki', 'icon', 'license', 'iconw', 'help', 'status',
-    'requires', 'communication', 'categories', 'download', 'files',
-    'description', 'readme'
-]
+from freecad.extman.utils.worker import create_process_pool
 
 # Regex to split comma separated string list
 COMMA_SEP_LIST_PATTERN = re.compile(r'\s*,\s*', re.S)
 
 
-def get_macro_tags(code, path):
-    tags = {k: None for k in MACRO_TAG_FILTER}
-    for m in MACRO_TAG_PATTERN.finditer(code):
-        tag = m.group('tag').lower()
-        if tag in MACRO_TAG_FILTER:
-            val = m.group('svalue') or m.group('dvalue')
-            tags[tag] = utils.SanitizedHtml(val)
-    return tags
-
+def read_macro_tags_cached(path):
+    """
+    Returns tags from the persistent macro index, parses and stores
+    them only if the file is new or changed.
+    """
 
-def build_macro_package(path, macro_name, is_core=False, is_git=False, is_wiki=False, install_path=None, base_path=""):
-
-    with open(path, 'r', encoding='utf-8') as f:
+    index = get_macro_index()
+    tags = index.lookup(path)
+    if tags is MISSING:
+        tags = read_macro_tags(path)
+        index.store(path, tags)
+    return tags
 
-        try:
-            tags = get_macro_tags(f.read(), path)
-        except:  # !TODO: Handle encoding problems in old windows platforms
-            tags = {k: None for k in MACRO_TAG_FILTER}
-            log_err(tr('Macro {0} contains invalid characters').format(path))
 
-        install_dir = get_macro_path()
-        base = dict(
-            key=str(install_path) if install_path else str(path),
-            type='Macro',
-            isCore=is_core,
-            installDir=install_dir,
-            installFile=Path(install_dir, path.name),
-            isGit=is_git,
-            isWiki=is_wiki,
-            basePath=base_path
-        )
-        tags.update(base)
+def read_macro_tags_batch(paths):
+    """
+    Returns tags of all paths (see read_macro_tags) using a process pool,
+    None if processes are not available.
+    """
+
+    pool = create_process_pool()
+    if pool is None:
+        return None
+
+    try:
+        with pool:
+            return list(pool.map(read_macro_tags, paths, chunksize=32))
+    except Exception as ex:
+        log_err(tr('Parallel macro parsing failed: {0}').format(ex))
+        return None
+
+
+def build_macro_package(path, macro_name, is_core=False, is_git=False, is_wiki=False, install_path=None, base_path="",
+                        tags=None):
+
+    if tags is None:
+        tags = read_macro_tags_cached(path)
+
+    if tags is None:
+        tags = {k: None for k in MACRO_TAG_FILTER}
+        log_err(tr('Macro {0} contains invalid characters').format(path))
+    else:
+        # Copy, do not touch tags shared with the macro index
+        tags = {k: utils.SanitizedHtml(v) for k, v in tags.items()}
+
+    install_dir = get_macro_path()
+    base = dict(
+        key=str(install_path) if install_path else str(path),
+        type='Macro',
+        isCore=is_core,
+        installDir=install_dir,
+        installFile=Path(install_dir, path.name),
+        isGit=is_git,
+        isWiki=is_wiki,
+        basePath=base_path
+    )
+    tags.update(base)
 
-        if not tags['title']:
-            tags['title'] = tags['name'] or macro_name
+    if not tags['title']:
+        tags['title'] = tags['name'] or macro_name
 
-        tags['name'] = macro_name  # Always override name with actual file name
+    tags['name'] = macro_name  # Always override name with actual file name
 
-        if not tags['icon']:
-            tags['icon'] = get_resource_path('html', 'img', 'package_macro.svg')
+    if not tags['icon']:
+        tags['icon'] = get_resource_path('html', 'img', 'package_macro.svg')
 
-        try:
-            if not Path(tags['icon']).exists():
-                tags['icon'] = get_resource_path('html', 'img', 'package_macro.svg')
-        except:
+    try:
+        if not Path(tags['icon']).exists():
             tags['icon'] = get_resource_path('html', 'img', 'package_macro.svg')
+    except:
+        tags['icon'] = get_resource_path('html', 'img', 'package_macro.svg')
 
-        tags['icon'] = utils.path_to_url(tags['icon'])
+    tags['icon'] = utils.path_to_url(tags['icon'])
 
-        if tags['comment']:
-            tags['description'] = tags['comment']
+    if tags['comment']:
+        tags['description'] = tags['comment']
 
-        if not tags['description']:
-            tags['description'] = tr('Warning! No description')
+    if not tags['description']:
+        tags['description'] = tr('Warning! No description')
 
-        if tags['categories']:
-            cats = COMMA_SEP_LIST_PATTERN.split(tags['categories'])
-            tags['categories'] = [tr(c) for c in cats]
-        else:
-            tags['categories'] = [tr('Uncategorized')]
+    if tags['categories']:
+        cats = COMMA_SEP_LIST_PATTERN.split(tags['categories'])
+        tags['categories'] = [tr(c) for c in cats]
+    else:
+        tags['categories'] = [tr('Uncategorized')]
 
-        if tags['files']:
-            tags['files'] = COMMA_SEP_LIST_PATTERN.split(tags['files'])
+    if tags['files']:
+        tags['files'] = COMMA_SEP_LIST_PATTERN.split(tags['files'])
 
-        if tags['readme']:
-            tags['readmeUrl'] = tags['readme']
-            tags['readmeFormat'] = 'html'
-        elif tags['wiki']:
-            tags['readmeUrl'] = tags['wiki']
-            tags['readmeFormat'] = 'html'
-        elif tags['web']:
-            tags['readmeUrl'] = tags['web']
-            tags['readmeFormat'] = 'html'
+    if tags['readme']:
+        tags['readmeUrl'] = tags['readme']
+        tags['readmeFormat'] = 'html'
+    elif tags['wiki']:
+        tags['readmeUrl'] = tags['wiki']
+        tags['readmeFormat'] = 'html'
+    elif tags['web']:
+        tags['readmeUrl'] = tags['web']
+        tags['readmeFormat'] = 'html'
 
-        return PackageInfo(**tags)
+    return PackageInfo(**tags)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Macro tags extraction. Runs in spawned worker processes, so only the
+standard library is imported here and values are returned as plain str.
+"""
+
+import re
+
+# Regex for tags __tag__ = value
+MACRO_TAG_PATTERN = re.compile(r'''
+    ^\s*
+    __(?P<tag>\w+?)__
+    \s*=\s*
+    (
+        ( (?P<sq>\'|\'{3}) (?P<svalue>[^\']+?) (?P=sq) )
+        |
+        ( (?P<dq>"|"{3})   (?P<dvalue>[^"]+?) (?P=dq) )
+    )
+    ''',
+                               re.I | re.S | re.M | re.X)
+
+# Allowed tags (Constant)
+MACRO_TAG_FILTER = [
+    'name', 'title', 'author', 'version', 'date', 'comment',
+    'web', 'wiki', 'icon', 'license', 'iconw', 'help', 'status',
+    'requires', 'communication', 'categories', 'download', 'files',
+    'description', 'readme'
+]
+
+# Lines allowed in the macro header: blank, indented, comments, imports,
+# dunder assignments, strings, closing brackets and try/except around imports
+MACRO_HEADER_LINE_PATTERN = re.compile(
+    r'''[\s#)\]}]|(import|from|try|except|else|finally)\b|__\w+__\s*=|[rRuUbBfF]*[\'"]''')
+
+# Triple quoted string delimiters
+TRIPLE_QUOTE_PATTERN = re.compile(r'''\'\'\'|"""''')
+
+# Any tag assignment line after the first code line, used to detect tags after the header.
+# Starts with a literal newline instead of ^ with re.M, which is much faster on long lines
+MACRO_TAG_LINE_PATTERN = re.compile(r'\n\s*__\w+?__\s*=')
+
+
+def get_macro_tags(code, path):
+    tags = {k: None for k in MACRO_TAG_FILTER}
+    for m in MACRO_TAG_PATTERN.finditer(code):
+        tag = m.group('tag').lower()
+        if tag in MACRO_TAG_FILTER:
+            tags[tag] = m.group('svalue') or m.group('dvalue')
+    return tags
+
+
+def read_macro_header(f):
+    """
+    Reads lines up to the first top level code statement (outside strings).
+    Returns (header, first code line or None at end of file)
+    """
+
+    lines = []
+    quote = None
+    for line in f:
+        if quote is None and not MACRO_HEADER_LINE_PATTERN.match(line):
+            return ''.join(lines), line
+        lines.append(line)
+        for m in TRIPLE_QUOTE_PATTERN.finditer(line):
+            if quote is None:
+                quote = m.group(0)
+            elif quote == m.group(0):
+                quote = None
+    return ''.join(lines), None
+
+
+def read_macro_tags(path):
+    """
+    Returns tags of macro file as a plain dict or None if it can not be decoded.
+    Only the header is parsed unless tag assignments are also found after it.
+    """
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header, code_line = read_macro_header(f)
+            if code_line is not None:
+                code = code_line + f.read()
+                if MACRO_TAG_LINE_PATTERN.search(code):
+                    return get_macro_tags(header + code, path)
+            return get_macro_tags(header, path)
+        except:  # !TODO: Handle encoding problems in old windows platforms
+            return None
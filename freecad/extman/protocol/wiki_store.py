@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from freecad.extman import get_cache_path, log
+
+
+class WikiPageStore:
+    """
+    On disk store of wiki pages and extracted macro code.
+    Texts are content addressed blobs (shared by revisions and titles),
+    each title points to the blobs of its last seen revision.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def getBlobPath(self, digest):
+        return Path(self.path, 'blobs', digest[:2], digest[2:])
+
+    def getRefPath(self, title):
+        name = hashlib.sha1(title.encode('utf-8')).hexdigest()
+        return Path(self.path, 'refs', name + '.json')
+
+    def writeBlob(self, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        blob_file = self.getBlobPath(digest)
+        if not blob_file.exists():
+            blob_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = '{0}.tmp{1}.{2}'.format(blob_file, os.getpid(), threading.get_ident())
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, str(blob_file))
+        return digest
+
+    def readBlob(self, digest):
+        try:
+            with open(self.getBlobPath(digest), 'rb') as f:
+                return f.read().decode('utf-8')
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def lookup(self, title):
+        """
+        Returns {'title', 'revid', 'page', 'code', 'link'} of the last stored
+        revision of title, None if not stored or its blobs are lost.
+        """
+
+        try:
+            with open(self.getRefPath(title), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('title') != title:
+            return None
+        for key in ('page', 'code'):
+            if entry.get(key) and not self.getBlobPath(entry[key]).exists():
+                return None
+        return entry
+
+    def store(self, title, revid, page, code=None, link=None):
+        """
+        Store page text and extracted code/link of title at revision revid.
+        Returns the stored entry.
+        """
+
+        entry = {'title': title, 'revid': revid, 'page': None, 'code': None, 'link': link}
+        ref_file = self.getRefPath(title)
+        try:
+            entry['page'] = self.writeBlob(page)
+            if code is not None:
+                entry['code'] = self.writeBlob(code)
+            ref_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = '{0}.tmp{1}.{2}'.format(ref_file, os.getpid(), threading.get_ident())
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_file, str(ref_file))
+        except (OSError, UnicodeEncodeError) as ex:
+            log('Wiki page not stored:', title, str(ex))
+        return entry
+
+
+wiki_store = WikiPageStore(Path(get_cache_path(), 'wiki', 'pages'))
@@ -4,6 +4,11 @@
  */
 function extman_filterPackages(filter) {
 
+    // Filter must see all packages
+    if (filter) {
+        extman_loadMorePackages(true);
+    }
+
     filter = filter.toUpperCase();
 
     // Restore category visibility
@@ -39,6 +44,102 @@ function extman_filterPackages(filter) {
 
 }
 
+/**
+ * Replace page fragments rendered by the backend.
+ * @param { {fragments: [ {selector, html, mode} ]} } data 
+ */
+function extman_updateFragments(data) {
+    var fragments = data.fragments || [];
+    fragments.forEach(function(fragment) {
+        var target = $(fragment.selector);
+        if (fragment.mode === 'replace') {
+            target.replaceWith(fragment.html);
+        }
+        else if (fragment.mode === 'append') {
+            target.append(fragment.html);
+        }
+        else {
+            target.html(fragment.html);
+        }
+    });
+    extman_hideSpinner();
+    var search = document.getElementById('package-search');
+    if (search && search.value) {
+        extman_filterPackages(search.value);
+    }
+    extman_observeMorePackages();
+}
+
+/**
+ * Request next page of packages, or all remaining pages.
+ * @param {Boolean} all 
+ */
+function extman_loadMorePackages(all) {
+    var more = document.getElementById('extman-more-packages');
+    if (more && !more._extman_loading) {
+        more._extman_loading = true;
+        extman_send_msg({
+            handler: 'on_load_packages',
+            offset: more.getAttribute('data-offset'),
+            all: !!all
+        }, extman_updateFragments);
+    }
+}
+
+/**
+ * Load next page of packages when the end of the list becomes visible.
+ * If the url points to a package not loaded yet, load all.
+ */
+function extman_observeMorePackages() {
+    var more = document.getElementById('extman-more-packages');
+    if (!more) {
+        return;
+    }
+    var anchor = window.location.hash.substring(1);
+    if (anchor && document.getElementsByName(anchor).length == 0) {
+        extman_loadMorePackages(true);
+        return;
+    }
+    if (anchor && !window._extman_anchorDone) {
+        window._extman_anchorDone = true;
+        document.getElementsByName(anchor)[0].scrollIntoView();
+    }
+    var observer = new IntersectionObserver(function(entries) {
+        for (var i = 0; i < entries.length; i++) {
+            if (entries[i].isIntersecting) {
+                observer.disconnect();
+                extman_loadMorePackages(false);
+                return;
+            }
+        }
+    }, {rootMargin: '600px'});
+    observer.observe(more);
+}
+
+/**
+ * Switch package view mode without reloading the page.
+ */
+function extman_setViewMode(event, mode) {
+    event.preventDefault();
+    extman_showSpinner();
+    extman_send_msg({handler: 'on_set_package_viewmode', vm: mode}, extman_updateFragments);
+}
+
+/**
+ * Install/Update package, result is pushed as fragments when done.
+ */
+function extman_installPackage(event, link) {
+    event.preventDefault();
+    var self = $(link);
+    var data = {
+        handler: 'on_install_package',
+        pkg: self.attr('data-pkg'),
+        source: self.attr('data-source'),
+        channel: self.attr('data-channel')
+    };
+    extman_send_msg(data, function() {});
+}
+
 /**
  * Ask for macro confirmation.
  */
@@ -189,3 +290,7 @@ function wikipage(data, url) {
     // Extract html
     return json.parse.text;
 }
+
+
+// Lazy loading of long package lists (requires MessageBus)
+$(document).on('extman:ready', extman_observeMorePackages);
@@ -205,6 +205,7 @@ $( document ).ready(function() {
                 window[data.handler](data)
             }
         });
+        $(document).trigger('extman:ready');
     });
 
     window.default_message_response = function(data) {
@@ -20,54 +20,170 @@
 # ***************************************************************************
 
 import json
+import operator
 from pathlib import Path
 
 import freecad.extman.utils as utils
 from freecad.extman import tr, get_cache_path
 
 
+class LazyPackageList:
+    """
+    Read only sequence of packages backed by serialized records.
+    PackageInfo objects are created by factory on first access and kept.
+    """
+
+    def __init__(self, records, factory):
+        self._items = list(records)
+        self._factory = factory
+
+    def _get(self, index):
+        item = self._items[index]
+        if isinstance(item, dict):
+            item = self._factory(item)
+            self._items[index] = item
+        return item
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._items)))]
+        return self._get(index)
+
+    def __iter__(self):
+        for i in range(len(self._items)):
+            yield self._get(i)
+
+    def iterFields(self, *fields):
+        """Yields tuples of field values per package without materializing them."""
+
+        for item in self._items:
+            if isinstance(item, dict):
+                yield tuple(item.get(f) for f in fields)
+            else:
+                yield tuple(getattr(item, f) for f in fields)
+
+
 class PackageCategory:
 
-    def __init__(self, name, packages=None):
+    def __init__(self, name, packages=None, continued=False):
         self.packages = packages or []
         self.name = name
+        self.continued = continued  # True if it is the continuation of a previous page
 
 
 class PackageInfo:
+    """
+    Package record with a fixed schema (slots).
+    Unknown fields (from manifests, macro tags, ...) are kept in `extra`
+    (None until needed) and are readable as attributes too.
+    installDir and installFile are read as Path but kept as given,
+    deserialized packages hold plain strings.
+    """
+
+    __slots__ = (
+        'key',  # Package identifier
+        'name',  # Name
+        '_installDir',  # where to install (see installDir)
+        '_installFile',  # for Macros: Path of installed file (see installFile)
+        'basePath',  # for Macros: full root of source file
+        'title',  # Displayed name
+        'description',  # description
+        'icon',  # icon url
+        'iconSources',  # List of alternative icons
+        'isCore',  # True for all packages included in FreeCAD
+        'type',  # Mod, Macro, Workbench
+        'isGit',  # is based on git?
+        'isWiki',  # is based on wiki?
+        'markedAsSafe',  # for Macros: if True, does not ask for confirm
+        'categories',  # Topics/Categories
+        'date',  # Last update
+        'version',  # Version
+        'git',  # Git Repoitory URL
+        'dependencies',  # List of dependencies
+        'homepage',  # Web
+        'flags',  # py2only, obsolete, banned
+        'readmeUrl',  # url of readme
+        'readmeFormat',  # markdown, mediawiki, html
+        'author',  # Authors
+        'channelId',  # Cloud package source channelId
+        'sourceName',  # Cloud package source name
+        'extra',  # Overflow: fields not in the schema
+    )
 
     def __init__(self, **kw):
 
         # Defaults
-        self.key = None  # Package identifier
-        self.name = None  # Name
-        self.installDir = None  # where to install
-        self.installFile = None  # for Macros: Path of installed file
-        self.basePath = ""  # for Macros: full root of source file
-        self.title = None  # Displayed name
-        self.description = None  # description
-        self.icon = None  # icon url
-        self.iconSources = []  # List of alternative icons
-        self.isCore = False  # True for all packages included in FreeCAD
-        self.type = 'Mod'  # Mod, Macro, Workbench
-        self.isGit = False  # is based on git?
-        self.isWiki = False  # is based on wiki?
-        self.markedAsSafe = False  # for Macros: if True, does not ask for confirm
-        self.categories = [tr('Uncategorized')]  # Topics/Categories
-        self.date = None  # Last update
-        self.version = None  # Version
-        self.git = None  # Git Repoitory URL
-        self.dependencies = None  # List of dependencies
-        self.homepage = None  # Web
-        self.flags = {}  # py2only, obsolete, banned
-        self.readmeUrl = None  # url of readme
-        self.readmeFormat = 'markdown'  # markdown, mediawiki, html
-        self.author = None  # Authors
-        self.channelId = None  # Cloud package source channelId
-        self.sourceName = None  # Cloud package source name
+        self.key = None
+        self.name = None
+        self.installDir = None
+        self.installFile = None
+        self.basePath = ""
+        self.title = None
+        self.description = None
+        self.icon = None
+        self.iconSources = []
+        self.isCore = False
+        self.type = 'Mod'
+        self.isGit = False
+        self.isWiki = False
+        self.markedAsSafe = False
+        self.categories = [tr('Uncategorized')]
+        self.date = None
+        self.version = None
+        self.git = None
+        self.dependencies = None
+        self.homepage = None
+        self.flags = {}
+        self.readmeUrl = None
+        self.readmeFormat = 'markdown'
+        self.author = None
+        self.channelId = None
+        self.sourceName = None
+        self.extra = None
 
         # Init all with parameters
-        for k, v in kw.items():
-            setattr(self, k, v)
+        if kw:
+            self.update(kw)
+
+    def __getattr__(self, name):
+        # Only called if name is not a slot (or extra is not set yet: copy, pickle)
+        if name != 'extra':
+            extra = self.extra
+            if extra and name in extra:
+                return extra[name]
+        raise AttributeError(name)
+
+    @property
+    def installDir(self):
+        value = self._installDir
+        return Path(value) if isinstance(value, str) else value
+
+    @installDir.setter
+    def installDir(self, value):
+        self._installDir = value
+
+    @property
+    def installFile(self):
+        value = self._installFile
+        return Path(value) if isinstance(value, str) else value
+
+    @installFile.setter
+    def installFile(self, value):
+        self._installFile = value
+
+    def update(self, data):
+        """Set fields from dict, unknown fields go to extra"""
+
+        for k, v in data.items():
+            if k in PACKAGE_INFO_FIELDS:
+                setattr(self, k, v)
+            elif self.extra is None:
+                self.extra = {k: v}
+            else:
+                self.extra[k] = v
 
     def isInstalled(self):
 
@@ -92,11 +208,12 @@ class PackageInfo:
             return self.icon[0]
 
     def toSerializable(self):
-        serializable = {}
-        for k, v in self.__dict__.items():
-            if isinstance(v, (int, str, float, bool, list, dict)):
-                serializable[k] = v
-            elif v is None:
+        serializable = dict(zip(PACKAGE_INFO_VALUE_FIELDS, _get_package_values(self)))
+        for k, slot in PACKAGE_INFO_PATH_FIELDS:
+            v = getattr(self, slot)
+            serializable[k] = None if v is None else str(v)
+        for k, v in (self.extra or {}).items():
+            if v is None or isinstance(v, (int, str, float, bool, list, dict)):
                 serializable[k] = v
             else:
                 serializable[k] = str(v)
@@ -104,16 +221,87 @@ class PackageInfo:
 
     @staticmethod
     def fromSerializable(serializable):
-        data = {}
-        for k, v in serializable.items():
-            if k in ('installDir', 'installFile'):
-                if v:
-                    data[k] = Path(v)
-                else:
-                    data[k] = None
+        pkg = PackageInfo()
+        pkg.update(serializable)
+        pkg._installDir = pkg._installDir or None
+        pkg._installFile = pkg._installFile or None
+        return pkg
+
+
+PACKAGE_INFO_FIELDS = frozenset(f.lstrip('_') for f in PackageInfo.__slots__) - {'extra'}
+PACKAGE_INFO_PATH_FIELDS = (('installDir', '_installDir'), ('installFile', '_installFile'), ('basePath', 'basePath'))
+PACKAGE_INFO_VALUE_FIELDS = tuple(f for f in PackageInfo.__slots__
+                                  if f in PACKAGE_INFO_FIELDS and f not in dict(PACKAGE_INFO_PATH_FIELDS))
+_get_package_values = operator.attrgetter(*PACKAGE_INFO_VALUE_FIELDS)
+
+
+class PackageIndex:
+    """
+    Packages of a list of categories by name, key and git url.
+    The first occurrence wins as packages appear in several categories.
+    Entries of lazy lists are kept as (list, position) until requested.
+    """
+
+    def __init__(self, categories=()):
+        self.categories = categories
+        self.byName = {}
+        self.byKey = {}
+        self.byGit = {}
+        for cat in categories:
+            packages = cat.packages
+            if isinstance(packages, LazyPackageList):
+                for i, (name, key, git) in enumerate(packages.iterFields('name', 'key', 'git')):
+                    self._add((packages, i), name, key, git)
             else:
-                data[k] = v
-        return PackageInfo(**data)
+                for pkg in packages:
+                    self._add(pkg, pkg.name, pkg.key, pkg.git)
+
+    @staticmethod
+    def normalizeGitUrl(url):
+        url = url.strip().rstrip('/').lower()
+        return url[:-4] if url.endswith('.git') else url
+
+    def _add(self, entry, name, key, git):
+        if name:
+            self.byName.setdefault(name, entry)
+        if key:
+            self.byKey.setdefault(key, entry)
+        if git:
+            self.byGit.setdefault(self.normalizeGitUrl(git), entry)
+
+    @staticmethod
+    def _resolve(entry):
+        if isinstance(entry, tuple):
+            packages, i = entry
+            return packages[i]
+        return entry
+
+    def add(self, pkg):
+        """Add or replace pkg"""
+
+        self.remove(pkg)
+        self._add(pkg, pkg.name, pkg.key, pkg.git)
+
+    def remove(self, pkg):
+        for mapping, value in ((self.byName, pkg.name), (self.byKey, pkg.key), (self.byGit, pkg.git)):
+            if value:
+                if mapping is self.byGit:
+                    value = self.normalizeGitUrl(value)
+                entry = mapping.get(value)
+                if entry is not None and self._resolve(entry).name == pkg.name:
+                    del mapping[value]
+
+    def findByName(self, name):
+        entry = self.byName.get(name)
+        return None if entry is None else self._resolve(entry)
+
+    def findByKey(self, key):
+        entry = self.byKey.get(key)
+        return None if entry is None else self._resolve(entry)
+
+    def findByGit(self, url):
+        entry = self.byGit.get(self.normalizeGitUrl(url))
+        return None if entry is None else self._resolve(entry)
 
 
 class PackageSource:
@@ -123,6 +311,7 @@ class PackageSource:
         self.name = None
         self.channelId = None
         self.isInstalledSource = False
+        self.index = None
 
     def getTitle(self):
         return 'Unknown'
@@ -151,12 +340,23 @@ class PackageSource:
     def getReadmeUrl(self, pkg):
         pass
 
+    def getIndex(self):
+        """Index of cached categories, rebuilt only if categories changed"""
+
+        categories = self.getCategories(cache=True)
+        index = self.index
+        if index is None or index.categories is not categories:
+            index = self.index = PackageIndex(categories)
+        return index
+
     def findPackageByName(self, name):
-        cache = self.getCategories(cache=True)
-        for cat in cache:
-            pkg = next((p for p in cat.packages if p.name == name), None)
-            if pkg:
-                return pkg
+        return self.getIndex().findByName(name)
+
+    def findPackageByKey(self, key):
+        return self.getIndex().findByKey(key)
+
+    def findPackageByGit(self, url):
+        return self.getIndex().findByGit(url)
 
 
 class UnsupportedSourceException(Exception):
@@ -204,6 +404,29 @@ def groupPackagesInCategories(packages):
     return categories
 
 
+def pagePackagesInCategories(categories, offset=0, limit=None):
+    """
+    Slice grouped packages into pages keeping categories order.
+    Returns (categories of the page, offset of the next page or None)
+    """
+
+    total = sum((len(cat.packages) for cat in categories))
+    end = offset + limit if limit else total
+    page = []
+    start = 0
+    for cat in categories:
+        count = len(cat.packages)
+        cat_start = max(offset - start, 0)
+        cat_end = min(end - start, count)
+        if cat_start < cat_end:
+            page.append(PackageCategory(cat.name, cat.packages[cat_start:cat_end], cat_start > 0))
+        start += count
+        if start >= end:
+            break
+
+    return page, (end if end < total else None)
+
+
 def savePackageMetadata(pkg):
 
     if pkg.type == 'Macro':
@@ -241,14 +464,10 @@ def loadPackageMetadata(pkg):
             content = f.read()
             content = utils.restore_absolute_paths(content)
             data = json.loads(content)
-            for k, v in data.items():
-                if k in ('installDir', 'installFile'):
-                    if v:
-                        setattr(pkg, k, Path(v))
-                    else:
-                        setattr(pkg, k, None)
-                else:
-                    setattr(pkg, k, v)
+            pkg.update(data)
+            for k in ('installDir', 'installFile'):
+                v = getattr(pkg, k)
+                setattr(pkg, k, Path(v) if v else None)
             return True
 
     return False
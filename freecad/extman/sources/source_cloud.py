@@ -31,10 +31,18 @@ from freecad.extman.protocol.fcwiki import FCWikiProtocol
 from freecad.extman.protocol.framagit import FramagitProtocol
 from freecad.extman.protocol.github import GithubProtocol
 from freecad.extman.sources import (
-    PackageInfo, PackageSource, PackageCategory, UnsupportedSourceException,
+    PackageInfo, PackageSource, PackageCategory, LazyPackageList, UnsupportedSourceException,
     groupPackagesInCategories, savePackageMetadata)
+from freecad.extman.sources.source_installed import InstalledPackageSource
+from freecad.extman.utils.cache_basic import use_cache_area
 from freecad.extman.utils.preferences import ExtManParameters
 
+# Process wide catalogue cache: (channelId, name) => (mtime, checkTime, categories)
+use_catalogue_cache, clear_catalogue_cache = use_cache_area('catalogues')
+
+# Version of the catalogue cache file format, increment on incompatible changes
+CATALOGUE_CACHE_VERSION = 3
+
 
 class CloudPackageSource(PackageSource):
 
@@ -138,43 +146,101 @@ class CloudPackageSource(PackageSource):
         filename = re.sub(r'\W+', '-', "{0}-{1}".format(self.channelId, self.name)) + '.json'
         return Path(store, filename)
 
+    def getCacheKey(self):
+        return self.channelId, self.name
+
     def updatePackageList(self):
+        _, invalidate = use_catalogue_cache(self.getCacheKey())
+        invalidate(None)
         cache_file = self.getCacheFile()
         if cache_file.exists():
             cache_file.unlink()
 
+    def getMemoryCacheData(self):
+        """
+        Returns categories cached in memory if still valid:
+        within TTL without disk access, after TTL if cache file did not change.
+        """
+
+        cached, update = use_catalogue_cache(self.getCacheKey())
+        if not cached:
+            return None
+
+        mtime, check_time, categories = cached
+        now = time.time()
+        if now - check_time < ExtManParameters.CatalogueCacheTTL:
+            return categories
+
+        try:
+            if self.getCacheFile().stat().st_mtime == mtime:
+                update((mtime, now, categories))
+                return categories
+        except OSError:
+            pass
+
+        update(None)
+        return None
+
+    def setMemoryCacheData(self, mtime, categories):
+        _, update = use_catalogue_cache(self.getCacheKey())
+        update((mtime, time.time(), categories))
+        self.cacheTime = mtime
+
     def storeCacheData(self, categories):
         filename = self.getCacheFile()
+        roots = utils.get_path_placeholders()
         j_categories = []
         for cat in categories:
             j_packages = []
             for pkg in cat.packages:
-                j_packages.append(pkg.toSerializable())
+                j_packages.append(compact_catalogue_record(pkg.toSerializable(), roots))
             j_categories.append({'name': cat.name, 'packages': j_packages})
+        data = {
+            'version': CATALOGUE_CACHE_VERSION,
+            'roots': [placeholder for placeholder, _ in roots],
+            'categories': j_categories
+        }
         with open(filename, 'w', encoding='utf-8') as f:
-            content = json.dumps(j_categories, indent=4, sort_keys=True)
-            content = utils.remove_absolute_paths(content)
-            f.write(content)
-            self.cacheTime = time.time()
+            json.dump(data, f, separators=(',', ':'))
+        self.setMemoryCacheData(filename.stat().st_mtime, categories)
 
     def loadCacheData(self):
+        categories = self.getMemoryCacheData()
+        if categories is not None:
+            return categories
+
         filename = self.getCacheFile()
         if filename.exists():
             self.cacheTime = filename.stat().st_mtime
             with open(filename, 'r', encoding='utf-8') as f:
-                content = f.read()
-                content = utils.restore_absolute_paths(content)
-                data = json.loads(content)
-                categories = []
-                for j_category in data:
-                    packages = []
-                    if 'packages' in j_category:
-                        for j_package in j_category['packages']:
-                            pkg = PackageInfo.fromSerializable(j_package)
-                            packages.append(pkg)
-                    cat = PackageCategory(j_category['name'], packages)
-                    categories.append(cat)
-                return categories
+                data = json.load(f)
+
+            # Older or unknown formats are handled as a cache miss
+            if not isinstance(data, dict) or data.get('version') != CATALOGUE_CACHE_VERSION:
+                return None
+
+            current = dict(utils.get_path_placeholders())
+            roots = [current.get(placeholder, placeholder) for placeholder in data['roots']]
+
+            def materialize(record):
+                return PackageInfo.fromSerializable(expand_catalogue_record(record, roots))
+
+            categories = []
+            for j_category in data['categories']:
+                packages = LazyPackageList(j_category['packages'], materialize)
+                cat = PackageCategory(j_category['name'], packages)
+                categories.append(cat)
+            self.setMemoryCacheData(self.cacheTime, categories)
+            return categories
+
+    def prefetch(self, pkgNames):
+        """
+        Warm up protocol caches before installing many packages
+        """
+
+        pkgs = [pkg for pkg in map(self.findPackageByName, pkgNames) if pkg and pkg.type == 'Macro']
+        if pkgs:
+            self.protocol.prefetchMacros(pkgs)
 
     def install(self, pkgName):
 
@@ -190,14 +256,72 @@ class CloudPackageSource(PackageSource):
             elif pkg.type == 'Macro':
                 result = self.protocol.installMacro(pkg)
 
-        # Save meta cache
+        # Save meta cache, analysed on a copy: pkg is shared by the catalogue cache
         if result and result.ok:
-            utils.analyse_installed_workbench(pkg)
-            savePackageMetadata(pkg)
+            installed = PackageInfo.fromSerializable(pkg.toSerializable())
+            utils.analyse_installed_workbench(installed)
+            savePackageMetadata(installed)
+            InstalledPackageSource().addInstalledPackage(installed)
 
         return result
 
 
+def compact_catalogue_record(record, roots):
+    """
+    Moves absolute paths out of a serialized package into '$paths' (scalars)
+    and '$pathLists' (lists of strings) as (root index, relative part).
+    Dict values are compacted the same way, into a copy.
+    """
+
+    paths = {}
+    path_lists = {}
+    for key, value in record.items():
+        if isinstance(value, str):
+            split = utils.split_placeholder_path(value, roots)
+            if split:
+                paths[key] = split
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            items = [utils.split_placeholder_path(item, roots) or item for item in value]
+            if any(not isinstance(item, str) for item in items):
+                path_lists[key] = items
+        elif isinstance(value, dict):
+            record[key] = compact_catalogue_record(dict(value), roots)
+
+    for key in paths:
+        del record[key]
+    for key in path_lists:
+        del record[key]
+    if paths:
+        record['$paths'] = paths
+    if path_lists:
+        record['$pathLists'] = path_lists
+    return record
+
+
+def expand_catalogue_record(record, roots):
+    """
+    Reverse of compact_catalogue_record using current roots.
+    Returns a new record, cached records may be expanded by several threads.
+    """
+
+    record = dict(record)
+    paths = record.pop('$paths', None)
+    if paths:
+        for key, (index, rel) in paths.items():
+            record[key] = roots[index] + rel
+
+    path_lists = record.pop('$pathLists', None)
+    if path_lists:
+        for key, items in path_lists.items():
+            record[key] = [item if isinstance(item, str) else roots[item[0]] + item[1] for item in items]
+
+    for key, value in record.items():
+        if isinstance(value, dict) and ('$paths' in value or '$pathLists' in value):
+            record[key] = expand_catalogue_record(value, roots)
+
+    return record
+
+
 class CloudPackageChannel:
 
     def __init__(self, cid, name, sources):
@@ -241,14 +365,14 @@ def findCloudChannels():
 
 
 def findSource(channelId, name):
-    data = getSourcesData()
-    for channel in data:
-        if channel['id'] == channelId:
-            for source in channel['sources']:
-                if source['name'] == name:
-                    return CloudPackageSource(source, channelId)
+    for channel in findCloudChannels():
+        if channel.id == channelId:
+            for source in channel.sources:
+                if source.name == name:
+                    return source
 
 
 def clearSourcesCache():
     getSourcesData.cache_clear()
     findCloudChannels.cache_clear()
+    clear_catalogue_cache()
@@ -31,11 +31,16 @@ import freecad.extman.protocol.github as gh
 from freecad.extman.protocol import flags
 from freecad.extman import get_resource_path, log, log_err, tr, get_macro_path, get_mod_path, get_freecad_resource_path
 from freecad.extman import utils
+from freecad.extman.protocol.macro_index import get_macro_index
 from freecad.extman.protocol.macro_parser import build_macro_package
 from freecad.extman.protocol.manifest import ExtensionManifest
 from freecad.extman.sources import (
-    PackageInfo, PackageSource, groupPackagesInCategories,
+    PackageInfo, PackageSource, PackageIndex, groupPackagesInCategories,
     savePackageMetadata, loadPackageMetadata)
+from freecad.extman.utils.cache_basic import use_cache_area
+
+# Process wide index of installed packages, refreshed on every full scan
+use_installed_cache, clear_installed_cache = use_cache_area('installed')
 
 
 class InstalledPackageSource(PackageSource):
@@ -76,8 +81,34 @@ class InstalledPackageSource(PackageSource):
 
     def getCategories(self, cache=True):
         categories = groupPackagesInCategories(self.getPackages())
+        _, set_index = use_installed_cache('index')
+        set_index(PackageIndex(categories))
         return categories
 
+    def getIndex(self):
+        """Shared index, the filesystem is scanned only if there is none yet"""
+
+        index, _ = use_installed_cache('index')
+        if index is None:
+            self.getCategories()
+            index, _ = use_installed_cache('index')
+        return index
+
+    def addInstalledPackage(self, pkg):
+        """Update the index after pkg (from any source) has been installed"""
+
+        index, _ = use_installed_cache('index')
+        if index is None:
+            return
+        if pkg.type == 'Macro' and pkg.installFile:
+            installed = self.importMacro(pkg.installFile, pkg.installFile.name)
+        elif pkg.installDir:
+            installed = self.importMod(self.userModDir, pkg.installDir, False)
+        else:
+            installed = None
+        if installed:
+            index.add(installed)
+
     def importMods(self, path, isCore=False):
         packages = []
         if path.exists():
@@ -96,6 +127,7 @@ class InstalledPackageSource(PackageSource):
                     pkg = self.importMacro(macro_path, macro_path.name, isCore)
                     if pkg:
                         packages.append(pkg)
+            get_macro_index().save()
         return packages
 
     def importMacro(self, path, file_name, isCore=False):
@@ -151,6 +183,9 @@ class InstalledPackageSource(PackageSource):
                 shutil.rmtree(pkg.installDir, ignore_errors=True)                
         except BaseException as e:
             log_err(str(e))
+        index, _ = use_installed_cache('index')
+        if index is not None:
+            index.remove(pkg)
 
 
 def analyseInstalledMod(pkg):
@@ -191,8 +226,7 @@ def analyseManifest(pkg):
             manifest = ExtensionManifest(f.read())
             data = {}
             manifest.getData(data)
-            for k, v in data.items():
-                setattr(pkg, k, v)
+            pkg.update(data)
 
 
 def analyseReadme(pkg):
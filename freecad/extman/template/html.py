@@ -20,26 +20,18 @@
 # ***************************************************************************
 
 import hashlib
-import random
-import re
-import textwrap
-import time
 import traceback
-from io import StringIO
 from urllib.parse import quote
 
 from freecad.extman import tr, log
+from freecad.extman.template.html_cache import (
+    get_cached_template, load_template_bytecode, save_template_bytecode)
+from freecad.extman.template.html_compiler import compile_template
 from freecad.extman.template.html_components import components
 from freecad.extman.template.html_utils import get_resource_url
 
-# ${t:text}                          => Translate text
-# ${e:expression}                    => eval expression
-# ${x:statement}                     => exec statement
-# ${e:include(*template, **params)}  => include template with params
-TEMPLATE_EXPR_PATTERN = re.compile(r'\${([tex]:)?\s*([^}]+)}', flags=re.S)
-TEMPLATE_EXEC_PATTERN = re.compile(r'<script\s+type\s*=\s*["\']text/python["\']\s*>(.*?)</script>', flags=re.S)
-TEMPLATE_MACRO_PATTERN = re.compile(r'@{macro:\s*(\w+)\b[^}]*}(.*?)@{/macro}', flags=re.S)
-
+# Minimum size of streamed chunks
+STREAM_CHUNK_SIZE = 16 * 1024
 
 def sha256(input):
     return hashlib.sha256(input.encode()).hexdigest()
@@ -63,80 +55,118 @@ def template_macro(name, code, path):
     Main Template Engine Macro Builder
     """
 
-    def macro_def(model):
+    def macro_def(model, stream=None):
         def macro_impl(**args):
             scope = dict(model)
             scope.update(args)
-            evaluator = template_expression_evaluator(path, scope)
-            return TEMPLATE_EXPR_PATTERN.sub(evaluator, code)
+            return execute_template(code, path, scope, stream)
 
         return macro_impl
 
     return macro_def
 
 
-class HtmlPrint:
+class TemplateStream:
+    """
+    Output buffer shared by a template and, when streaming,
+    by all its includes and macros. Chunks are passed to write(text).
+    """
+
+    def __init__(self, write=None, chunk_size=STREAM_CHUNK_SIZE):
+        self.write = write
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.flushed = 0  # Number of buffer items already written
+
+    def position(self):
+        return self.flushed + len(self.buffer)
+
+    def rollback(self, mark):
+        # Already written chunks cannot be rolled back
+        del self.buffer[max(mark - self.flushed, 0):]
+
+    def flush(self, force=False):
+        if self.write and self.buffer:
+            chunk = "".join(self.buffer)
+            count = len(self.buffer)
+            if force or len(chunk) >= self.chunk_size:
+                self.buffer.clear()
+                self.flushed += count
+                self.write(chunk)
+            else:
+                # Collapse pending items, keeping positions stable
+                self.buffer[:] = [chunk] + [''] * (count - 1)
+
+    def getvalue(self):
+        return "".join(self.buffer)
+
+
+class TemplateOutput:
+    """
+    Output buffer and runtime support of compiled templates
+    """
+
+    def __init__(self, path, scope, stream=None):
+        self.path = path
+        self.scope = scope
+        self.stream = stream or TemplateStream()
+        self.buffer = self.stream.buffer
+        scope['__out__'] = self
+        scope['__emit__'] = self.buffer.append
+        scope['__tr__'] = tr
+        scope['hprint'] = self.print
+
+    def print(self, *args):
+        self.buffer.append("".join((str(arg) for arg in args)))
 
-    def __init__(self):
-        self.out = StringIO()
+    def value(self, output):
+        if output:
+            self.buffer.append(str(output))
 
-    def __call__(self, *args):
-        result = "".join((str(arg) for arg in args))
-        self.out.write(result)
+    def symbol(self, name, etype):
+        self.buffer.append(str(self.scope.get(name, '???{0}{1}???'.format(etype, name))))
 
-    def get_output(self):
-        output = self.out.getvalue()
-        self.out.close()
-        del self.out
-        return output
+    def mark(self):
+        return self.stream.position()
 
+    def check(self, source, mode):
+        compile(source, str(self.path), mode)
 
-def template_expression_evaluator(path, model):
+    def fail(self, mark, source):
+        log(traceback.format_exc())
+        log("Error executing expression {0} in template {1}".format(source, self.path))
+        if mark is not None:
+            self.stream.rollback(mark)
+        self.buffer.append('Error:' + traceback.format_exc())
+
+
+class CompiledTemplate:
     """
-    Main Template Engine Evaluator
+    Compiled template: main code and macros
     """
 
-    def compile_and_execute(eexpr, emodel, mode='eval'):
-        if mode == 'eval':
-            output = eval(eexpr, {}, emodel)
-            return output if output else ''
-        else:
-            compiled = compile(eexpr, '<string>', mode)
-            saved_print = emodel.get('hprint')
-            print_stream = HtmlPrint()
-            try:
-                emodel['hprint'] = print_stream
-                exec(compiled, {}, emodel)
-            finally:
-                emodel['hprint'] = saved_print
-            output = print_stream.get_output()
-            return output if output else ''
-
-    def eval_expr(match):
-        try:
-            etype = match.group(1)
-            eexpr = match.group(2)
-            # Translate shortcut
-            if etype == 't:':
-                return tr(eexpr)
-            # Eval Expression
-            elif etype == 'e:':
-                return compile_and_execute(eexpr, model, 'eval')
-            # Execute Statement
-            elif etype == 'x:':
-                return compile_and_execute(eexpr, model, 'exec')
-            # Resolve local symbol
-            else:
-                return str(model.get(eexpr, '???{0}{1}???'.format(etype, eexpr)))
-        except:  # Catch All Errors/Exceptions
-            log(traceback.format_exc())
-            log("Error executing expression {0} in template {1}".format(eexpr, path))
-            return 'Error:' + traceback.format_exc()
+    def __init__(self, path, code, macros):
+        self.path = path
+        self.code = code
+        self.macros = {name: template_macro(name, mcode, path) for name, mcode in macros.items()}
+
+
+def execute_template(code, path, scope, stream=None):
+    """
+    Run compiled template code against scope.
+    If stream is provided, output is written in place into
+    the stream and an empty string is returned.
+    """
 
-    return eval_expr
+    output = TemplateOutput(path, scope, stream)
+    exec(code, scope)
+    if stream:
+        stream.flush()
+        return ''
+    return output.stream.getvalue()
 
 
-def template_mapper(*base_path, model=None):
+def template_mapper(*base_path, model=None, stream=None):
     """
     Main Template Engine Mapper (include)
     """
@@ -148,88 +178,82 @@ def template_mapper(*base_path, model=None):
         url, context, abs_path = get_resource_url(*sub_path)
         scope = dict(model or {})
         scope.update({'params': DictObject(params)})
-        return process_template(abs_path, scope)
+        return process_template(abs_path, scope, stream)
 
     return map_template
 
 
-def process_template(path, model):
+def process_template(path, model, stream=None):
     """
     Load template from path and evaluate it
     """
 
-    (html, macros) = get_template(path)
+    template = get_template(path)
     scope = dict(model or {})
-    for name, builder in macros.items():
-        scope[name] = builder(scope)
+    for name, builder in template.macros.items():
+        scope[name] = builder(scope, stream)
 
-    evaluator = template_expression_evaluator(path, scope)
-    return TEMPLATE_EXPR_PATTERN.sub(evaluator, html)
+    return execute_template(template.code, path, scope, stream)
 
 
-def parse_macros(code, path):
+def load_template(path, stamp):
     """
-    Main Template Engine: Parse macros into callable functions
+    Load compiled template from bytecode cache or compile it
     """
 
-    macros = {}
-
-    def save_macro(match):
-        name = match.group(1)
-        code = match.group(2)
-        macros[name] = template_macro(name, code, path)
-        return ""
+    compiled = load_template_bytecode(path, stamp)
+    if compiled is None:
+        with open(path) as f:
+            compiled = compile_template(f.read(), path)
+        save_template_bytecode(path, stamp, compiled)
+    code, macros = compiled
+    return CompiledTemplate(path, code, macros)
 
-    parsed = TEMPLATE_MACRO_PATTERN.sub(save_macro, code)
-    return parsed, macros
 
-
-def parse_blocks(code, path):
+def get_template(path):
     """
-    Main Template Engine: Parse python blocks into callable functions
+    Returns compiled template, loaded only once until the file changes
     """
-    blocks = {}
 
-    def compile_block(match):
-        block = textwrap.dedent(match.group(1))
-        name = "block_{0}_{1}".format(random.randint(0, 65000), int(time.time()))
-        blocks[name] = template_macro(name, block, path)
-        return '${x:' + block + '()}'
+    return get_cached_template(path, load_template)
 
-    parsed = TEMPLATE_EXEC_PATTERN.sub(compile_block, code)
-    return parsed, blocks
 
+def prepare_model(abs_path, url, context, model, stream=None):
+    # Per call copy, the caller's model (i.e. the browser session model) is shared
+    model = dict(model)
+    model['_URL_'] = url
+    model['_BASE_'] = context
+    model['_FILE_'] = abs_path
+    model['include'] = template_mapper(abs_path, model=model, stream=stream)
+    model['tr'] = tr
+    model['comp'] = components
+    model['urlencode'] = quote
+    model['sha256'] = sha256
+    return model
 
-def get_template(path):
+
+def render(*path, model):
     """
-    Main Template Engine Parser
+    Main Template Engine Renderer
     """
 
-    with open(path) as f:
-        # Read all template code
-        code = f.read()
-        # Compile all blocks
-        code, blocks = parse_blocks(code, path)
-        # Parse all macros
-        code, macros = parse_macros(code, path)
-        # Merge macros ad blocks
-        macros.update(blocks)
-        return code, macros
+    url, context, abs_path = get_resource_url(*path)
+    model = prepare_model(abs_path, url, context, model)
+    return process_template(abs_path, model=model), url
 
 
-def render(*path, model):
+def render_stream(*path, model, write, chunk_size=STREAM_CHUNK_SIZE):
     """
-    Main Template Engine Renderer
+    Main Template Engine Streaming Renderer:
+        Output is passed in chunks to write(text) as soon as includes
+        and macros are rendered. In this mode include() and macros write
+        in place and return an empty string, so they must be printed
+        directly: hprint(include(...))
     """
 
     url, context, abs_path = get_resource_url(*path)
-
-    model['_URL_'] = url
-    model['_BASE_'] = context
-    model['_FILE_'] = abs_path
-    model['include'] = template_mapper(abs_path, model=model)
-    model['tr'] = tr
-    model['comp'] = components
-    model['urlencode'] = quote
-    model['sha256'] = sha256
-    return process_template(abs_path, model=model), url
+    stream = TemplateStream(write, chunk_size)
+    model = prepare_model(abs_path, url, context, model, stream)
+    process_template(abs_path, model=model, stream=stream)
+    stream.flush(force=True)
+    return url
@@ -19,4 +19,86 @@
 # *                                                                         *
 # ***************************************************************************
 
+import hashlib
+import marshal
+import os
+from importlib.util import MAGIC_NUMBER
+from pathlib import Path
+
+from freecad.extman import get_cache_path, log
 from freecad.extman.utils.cache_basic import use_cache_area
+
+# Increment when generated code changes
+TEMPLATE_BYTECODE_VERSION = 1
+
+use_template_cache, clear_template_cache = use_cache_area('templates')
+
+
+def get_template_stamp(path):
+    """
+    Returns (mtime, size) of template file, used to detect changes
+    """
+
+    stat = Path(path).stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_cached_template(path, loader):
+    """
+    Returns compiled template from memory cache,
+    calls loader(path, stamp) if it is not cached or if the file changed
+    """
+
+    stamp = get_template_stamp(path)
+    cached, set_cached = use_template_cache(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    template = loader(path, stamp)
+    set_cached((stamp, template))
+    return template
+
+
+def get_template_bytecode_path(path):
+    """
+    Returns path of the bytecode cache file of the template
+    """
+
+    name = hashlib.sha256(str(path).encode()).hexdigest()
+    return Path(get_cache_path(), 'templates', name + '.pyc')
+
+
+def load_template_bytecode(path, stamp):
+    """
+    Returns (code, macros) from bytecode cache or None if missing or stale
+    """
+
+    cache_file = get_template_bytecode_path(path)
+    try:
+        with open(cache_file, 'rb') as f:
+            if f.read(len(MAGIC_NUMBER)) != MAGIC_NUMBER:
+                return None
+            if marshal.load(f) != (TEMPLATE_BYTECODE_VERSION, str(path)) + stamp:
+                return None
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def save_template_bytecode(path, stamp, compiled):
+    """
+    Store (code, macros) in bytecode cache
+    """
+
+    cache_file = get_template_bytecode_path(path)
+    tmp_file = cache_file.with_suffix('.tmp{0}'.format(os.getpid()))
+    try:
+        if not cache_file.parent.exists():
+            cache_file.parent.mkdir(parents=True)
+        with open(tmp_file, 'wb') as f:
+            f.write(MAGIC_NUMBER)
+            marshal.dump((TEMPLATE_BYTECODE_VERSION, str(path)) + stamp, f)
+            marshal.dump(compiled, f)
+        os.replace(str(tmp_file), str(cache_file))
+    except (OSError, ValueError) as ex:
+        log('Template bytecode cache not saved:', path, str(ex))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import ast
+import re
+import textwrap
+
+# ${t:text}                          => Translate text
+# ${e:expression}                    => eval expression
+# ${x:statement}                     => exec statement
+# ${e:include(*template, **params)}  => include template with params
+TEMPLATE_EXPR_PATTERN = re.compile(r'\${([tex]:)?\s*([^}]+)}', flags=re.S)
+TEMPLATE_EXEC_PATTERN = re.compile(r'<script\s+type\s*=\s*["\']text/python["\']\s*>(.*?)</script>', flags=re.S)
+TEMPLATE_MACRO_PATTERN = re.compile(r'@{macro:\s*(\w+)\b[^}]*}(.*?)@{/macro}', flags=re.S)
+
+# Any python block or expression
+TEMPLATE_TOKEN_PATTERN = re.compile('|'.join((TEMPLATE_EXEC_PATTERN.pattern, TEMPLATE_EXPR_PATTERN.pattern)), flags=re.S)
+
+# Generated code contract (names provided by the runtime in every scope):
+#   __emit__(text)              => append literal text to output buffer
+#   __tr__(text)                => translate
+#   __out__.value(value)        => append evaluated expression
+#   __out__.symbol(name, type)  => append local symbol
+#   __out__.mark()              => current output position
+#   __out__.fail(mark, source)  => rollback to mark and append error
+#   __out__.check(source, mode) => raise compilation error at render time
+
+
+class LineCounter:
+    """
+    Incremental offset to line number translation
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self.pos = 0
+        self.line = 1
+
+    def at(self, offset):
+        if offset < self.pos:
+            self.pos = 0
+            self.line = 1
+        self.line += self.code.count('\n', self.pos, offset)
+        self.pos = offset
+        return self.line
+
+
+def ast_name(name):
+    return ast.Name(id=name, ctx=ast.Load())
+
+
+def ast_call(func, *args):
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def ast_method(obj, name, *args):
+    return ast_call(ast.Attribute(value=ast_name(obj), attr=name, ctx=ast.Load()), *args)
+
+
+def ast_located(node, line):
+    node.lineno = line
+    node.col_offset = 0
+    node.end_lineno = max((getattr(n, 'end_lineno', None) or line for n in ast.walk(node)))
+    node.end_col_offset = 0
+    return node
+
+
+def ast_guarded(body, source, line, mark=False):
+    """
+    Wrap statements in try/except so errors are rendered in place
+    """
+
+    fail = ast_method('__out__', 'fail', ast_name('__mark__') if mark else ast.Constant(value=None), ast.Constant(value=source))
+    handler = ast.ExceptHandler(type=None, name=None, body=[ast.Expr(value=fail)])
+    guarded = [ast_located(ast.Try(body=body or [ast.Pass()], handlers=[handler], orelse=[], finalbody=[]), line)]
+    if mark:
+        mark_node = ast.Assign(targets=[ast.Name(id='__mark__', ctx=ast.Store())], value=ast_method('__out__', 'mark'))
+        guarded.insert(0, ast_located(mark_node, line))
+    return guarded
+
+
+def ast_parsed(source, mode, line):
+    tree = ast.parse(source, mode=mode)
+    ast.increment_lineno(tree, line - 1)
+    return tree.body
+
+
+def compile_literal(text, line):
+    return [ast_located(ast.Expr(value=ast_call(ast_name('__emit__'), ast.Constant(value=text))), line)]
+
+
+def compile_expression(etype, expr, line):
+    # Translate shortcut
+    if etype == 't:':
+        value = ast_call(ast_name('__emit__'), ast_call(ast_name('__tr__'), ast.Constant(value=expr)))
+        return [ast_located(ast.Expr(value=value), line)]
+
+    # Resolve local symbol
+    if etype is None:
+        value = ast_method('__out__', 'symbol', ast.Constant(value=expr), ast.Constant(value=etype))
+        return ast_guarded([ast.Expr(value=value)], expr, line)
+
+    mode = 'eval' if etype == 'e:' else 'exec'
+    try:
+        body = ast_parsed(expr, mode, line)
+    except SyntaxError:
+        # Keep the error local to this expression
+        check = ast_method('__out__', 'check', ast.Constant(value=expr), ast.Constant(value=mode))
+        return ast_guarded([ast.Expr(value=check)], expr, line)
+
+    # Eval Expression
+    if mode == 'eval':
+        return ast_guarded([ast.Expr(value=ast_method('__out__', 'value', body))], expr, line)
+
+    # Execute Statement
+    return ast_guarded(body, expr, line, mark=True)
+
+
+def compile_nodes(code, start, end, lines):
+    """
+    Compile template text between start and end into python statements
+    """
+
+    body = []
+    pos = start
+    for match in TEMPLATE_TOKEN_PATTERN.finditer(code, start, end):
+        if match.start() > pos:
+            body.extend(compile_literal(code[pos:match.start()], lines.at(pos)))
+        block = match.group(1)
+        if block is not None:
+            body.extend(compile_expression('x:', textwrap.dedent(block), lines.at(match.start(1))))
+        else:
+            body.extend(compile_expression(match.group(2), match.group(3), lines.at(match.start(3))))
+        pos = match.end()
+    if pos < end:
+        body.extend(compile_literal(code[pos:end], lines.at(pos)))
+    return body
+
+
+def compile_module(body, path):
+    module = ast.parse('')
+    module.body = body
+    ast.fix_missing_locations(module)
+    return compile(module, str(path), 'exec')
+
+
+def compile_template(code, path):
+    """
+    Main Template Engine Compiler:
+        Translates template code into python code objects that write
+        into the output buffer. Returns (code, {macro_name: code})
+    """
+
+    lines = LineCounter(code)
+    macros = {}
+    body = []
+    pos = 0
+    for match in TEMPLATE_MACRO_PATTERN.finditer(code):
+        body.extend(compile_nodes(code, pos, match.start(), lines))
+        macro_body = compile_nodes(code, match.start(2), match.end(2), lines)
+        macros[match.group(1)] = compile_module(macro_body, path)
+        pos = match.end()
+    body.extend(compile_nodes(code, pos, len(code), lines))
+    return compile_module(body, path), macros
@@ -23,6 +23,7 @@
 
 from freecad.extman.sources.source_installed import InstalledPackageSource
 import os
+from html import escape
 from urllib.parse import quote
 
 from freecad.extman import tr
@@ -167,14 +168,15 @@ def comp_btn_install_or_update_package(pkg):
     if hasattr(pkg, 'sourceName') and pkg.sourceName:
         return """
         <a class="btn btn-danger extman-loading" data-spinner-message="{0}"
-            href="action.install_package?pkg={1}&source={2}&channel={3}">
+            href="#" onclick="extman_installPackage(event, this)"
+            data-pkg="{1}" data-source="{2}" data-channel="{3}">
             {4}
         </a>
         """.format(
             TR_INSTALLING,
-            quote(pkg.name),
-            quote(pkg.sourceName),
-            quote(pkg.channelId),
+            escape(pkg.name),
+            escape(pkg.sourceName),
+            escape(pkg.channelId),
             TR_UPDATE if pkg.isInstalled() else TR_INSTALL)
     else:
         return ""
@@ -302,10 +304,10 @@ def comp_select_viewmode(mode):
     return """
         <div class="btn-group btn-group-sm float-right" role="group" aria-label="{0}" 
             style="margin-top: 10px; margin-right:10px; position: absolute; right: 20px;">
-            <a href="action.set_package_viewmode?vm=rows" class="btn btn-sm btn-outline-secondary {1}" title="{2}">
+            <a href="#" onclick="extman_setViewMode(event, 'rows')" class="btn btn-sm btn-outline-secondary {1}" title="{2}">
                 <img src="img/bootstrap/list.svg" />
             </a>
-            <a href="action.set_package_viewmode?vm=cards" class="btn btn-sm btn-outline-secondary {3}" title="{4}">
+            <a href="#" onclick="extman_setViewMode(event, 'cards')" class="btn btn-sm btn-outline-secondary {3}" title="{4}">
                 <img src="img/bootstrap/grid.svg" />
             </a>
         </div>
@@ -19,6 +19,7 @@
 # *                                                                         *
 # ***************************************************************************
 
+import functools
 from pathlib import Path
 
 from freecad.extman import get_resource_path
@@ -30,6 +31,7 @@ class Components:
             setattr(self, k, v)
 
 
+@functools.lru_cache(maxsize=1024)
 def get_resource_url(*path):
     """
     Translate path into (url, parent_url, abs_path)
@@ -42,12 +42,15 @@ WORKBENCH_CLASS_NAME_PATTERN = re.compile(r'addWorkbench\s*\(\s*(?P<class>\w+)')
 
 _CORE_RES_DIR_ = '_CORE_RES_DIR_'
 _CORE_RES_URL_ = '_CORE_RES_URL_'
+_CORE_RES_EXTMAN_URL_ = '_CORE_RES_EXTMAN_URL_'
 
 _USER_DATA_DIR_ = '_USER_DATA_DIR_'
 _USER_DATA_URL_ = '_USER_DATA_URL_'
+_USER_DATA_EXTMAN_URL_ = '_USER_DATA_EXTMAN_URL_'
 
 _USER_MACRO_DIR_ = '_USER_MACRO_DIR_'
 _USER_MACRO_URL_ = '_USER_MACRO_URL_'
+_USER_MACRO_EXTMAN_URL_ = '_USER_MACRO_EXTMAN_URL_'
 
 nonStandardNamedWorkbenches = {
     "flamingo": "flamingoToolsWorkbench",
@@ -182,6 +185,39 @@ def remove_absolute_paths(content):
     return content
 
 
+def get_path_placeholders():
+    """
+    Returns [(placeholder, absolute_path)] for all relocatable roots,
+    longest paths first so nested roots are matched before their parents.
+    """
+
+    core_res_dir = get_freecad_resource_path()
+    user_data_dir = get_app_data_path()
+    user_macro_dir = get_macro_path()
+    roots = [
+        (_CORE_RES_URL_, core_res_dir.as_uri()),
+        (_CORE_RES_EXTMAN_URL_, path_to_url(core_res_dir)),
+        (_CORE_RES_DIR_, str(core_res_dir)),
+        (_USER_DATA_URL_, user_data_dir.as_uri()),
+        (_USER_DATA_EXTMAN_URL_, path_to_url(user_data_dir)),
+        (_USER_DATA_DIR_, str(user_data_dir)),
+        (_USER_MACRO_URL_, user_macro_dir.as_uri()),
+        (_USER_MACRO_EXTMAN_URL_, path_to_url(user_macro_dir)),
+        (_USER_MACRO_DIR_, str(user_macro_dir)),
+    ]
+    roots.sort(key=lambda r: len(r[1]), reverse=True)
+    return roots
+
+
+def split_placeholder_path(value, roots):
+    """Returns (root_index, relative_part) if value starts with one of roots, else None."""
+
+    for i, (_, root) in enumerate(roots):
+        if value.startswith(root):
+            return i, value[len(root):]
+    return None
+
+
 def restore_absolute_paths(content):
     """Replace placeholders with current absolute paths."""
 
@@ -278,7 +314,9 @@ def analyse_installed_workbench(pkg):
             if isinstance(pkg, dict):
                 manifest.getData(pkg)
             else:
-                manifest.getData(pkg.__dict__)
+                data = {}
+                manifest.getData(data)
+                pkg.update(data)
 
     # Check Legacy InitGui.py
     init = Path(pkg.installDir, 'InitGui.py')
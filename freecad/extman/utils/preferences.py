@@ -29,6 +29,14 @@ __PARAMETER_OPTIONS__ = {
     'ProxyCheck': (str, 'none'),  # none, system, user
     'ProxyUrl': (str, ''),
     'PackagesViewMode': (str, 'rows'),  # rows, cards
+    'PackagesPageSize': (int, 60),  # Packages rendered per page, 0 = all
+    'CatalogueCacheTTL': (int, 300),  # Seconds before checking catalogue cache files again
+    'MacroParseProcessThreshold': (int, 256),  # Macros count to parse in worker processes, 0 = never
+    'HttpCacheSize': (int, 64),  # Max size of the http cache in MB
+    'HttpHostConcurrency': (int, 6),  # Max concurrent requests per host
+    'SyncModManifests': (bool, False),  # Fetch manifest.ini/metadata.txt of submodules
+    'SyncModReadmes': (bool, False),  # Fetch README of submodules
+    'GitSparseMacros': (bool, True),  # Clone macro repositories without blobs, checkout only macro files
     'CustomCloudSources': (str, '[]')
 }
 
@@ -19,8 +19,15 @@
 # *                                                                         *
 # ***************************************************************************
 
+import multiprocessing
+import os
+import queue
 import sys
+import threading
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from PySide import QtCore as qt
 
 
@@ -48,6 +55,135 @@ def run_in_main_thread(fn, *args, **kwargs):
     )
 
 
+# Priorities for Worker.start, higher runs first among queued workers
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+# Named executors and their max threads
+EXECUTOR_SIZES = {
+    'network': 8,  # Downloads, git, http
+    'metadata': 8,  # Manifest/readme fetches, waited on from 'network' jobs
+    'cpu': max(os.cpu_count() or 1, 1),  # Parsing
+    'fs': 2,  # Filesystem scans
+    'ui': 2,  # Controller jobs
+}
+
+
+class Executor:
+    """
+    Bounded thread pool dedicated to one kind of workload,
+    separated from the global pool shared with FreeCAD.
+    """
+
+    def __init__(self, name, max_threads):
+        self.name = name
+        self.pool = qt.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.maxQueued = 0
+
+    def submit(self, worker, priority=PRIORITY_NORMAL):
+        with self._lock:
+            self.submitted += 1
+            self.maxQueued = max(self.maxQueued, self.queued)
+        worker.executor = self
+        self.pool.start(worker, priority)
+        return worker
+
+    @property
+    def queued(self):
+        return self.submitted - self.started - self.cancelled
+
+    @property
+    def running(self):
+        return self.started - self.completed
+
+    def _on_started(self):
+        with self._lock:
+            self.started += 1
+
+    def _on_finished(self, started):
+        with self._lock:
+            if started:
+                self.completed += 1
+            else:
+                self.cancelled += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'maxThreads': self.pool.maxThreadCount(),
+                'submitted': self.submitted,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'maxQueued': self.maxQueued,
+            }
+
+
+__EXECUTORS__ = {}
+__EXECUTORS_LOCK__ = threading.Lock()
+
+
+def get_executor(name):
+    with __EXECUTORS_LOCK__:
+        executor = __EXECUTORS__.get(name)
+        if executor is None:
+            executor = Executor(name, EXECUTOR_SIZES[name])
+            __EXECUTORS__[name] = executor
+        return executor
+
+
+def executors_stats():
+    with __EXECUTORS_LOCK__:
+        executors = list(__EXECUTORS__.values())
+    return [e.stats() for e in executors]
+
+
+def find_python_executable():
+    """
+    Python interpreter for worker processes. Inside FreeCAD sys.executable
+    is usually FreeCAD itself, so look for the bundled interpreter.
+    """
+
+    executable = Path(sys.executable)
+    if executable.name.lower().startswith('python'):
+        return executable
+
+    names = ('python.exe', 'pythonw.exe') if sys.platform == 'win32' else ('python3', 'python')
+    for base in (executable.parent, Path(sys.exec_prefix, 'bin'), Path(sys.exec_prefix)):
+        for name in names:
+            candidate = Path(base, name)
+            if candidate.is_file():
+                return candidate
+
+
+def create_process_pool(max_workers=None):
+    """
+    Returns a new ProcessPoolExecutor (use as context manager) or None
+    if no python interpreter is found for the worker processes.
+    Workers are always spawned: forking this multithreaded process could
+    copy locks held by other threads (logging, Qt, macro index).
+    """
+
+    try:
+        python = find_python_executable()
+        if not python:
+            return None
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(str(python))
+        return ProcessPoolExecutor(max_workers=max_workers or EXECUTOR_SIZES['cpu'], mp_context=context)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
 class WorkerSignals(qt.QObject):
     started = qt.Signal(tuple)
     finished = qt.Signal(tuple)
@@ -65,11 +201,20 @@ class Worker(qt.QRunnable):
         self.isRunning = False
         self.isPending = True
         self._cancel = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.executor = None
         self.fn = fn
 
     def run(self):
         self.isPending = False
-        if not self._cancel:
+        if self._cancel:
+            if self.executor:
+                self.executor._on_finished(False)
+        else:
+            if self.executor:
+                self.executor._on_started()
             try:
                 self.isRunning = True
                 self.signals.started.emit((self,))
@@ -85,29 +230,96 @@ class Worker(qt.QRunnable):
                 traceback.print_exc(file=sys.stderr)
             finally:
                 self.isRunning = False
+                if self.executor:
+                    self.executor._on_finished(True)
+                self._finish()
                 self.signals.finished.emit((self.result, self.error, self))
 
-    def start(self):
-        qt.QThreadPool.globalInstance().start(self)
+    def _finish(self):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def start(self, executor='ui', priority=PRIORITY_NORMAL):
+        """Queue in the named executor, see EXECUTOR_SIZES"""
+        return get_executor(executor).submit(self, priority)
 
     def cancel(self):
         if self.isPending:
             self._cancel = True
+            self._finish()
             return True
         return False
 
-    def get(self):
+    def cancelled(self):
+        return self._cancel
+
+    def done(self):
+        return self._done.is_set()
+
+    def addDoneCallback(self, callback):
+        """
+        Call callback(worker) when finished or cancelled,
+        immediately (in the caller thread) if it is already done.
+        """
+
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        """Block without spinning until done, returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def get(self, timeout=None):
+        """
+        Block until done and return the result or raise the error.
+        Returns None if cancelled, raises TimeoutError on timeout.
+        """
+
+        if not self._done.wait(timeout):
+            raise TimeoutError()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def as_completed(workers, timeout=None):
+    """Yields workers as they finish (or are cancelled)"""
+
+    workers = list(workers)
+    finished = queue.Queue()
+    for worker in workers:
+        worker.addDoneCallback(finished.put)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for _ in workers:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            yield finished.get(timeout=remaining)
+        except queue.Empty:
+            raise TimeoutError()
+
 
-        while self.isPending:
-            if self._cancel:
-                return None
+def wait_all(workers, timeout=None):
+    """
+    Block until all workers are done and return their results in order.
+    The first error found is raised, TimeoutError on timeout.
+    """
 
-        while True:
-            if not self.isRunning:
-                if self.error:
-                    raise self.error
-                else:
-                    return self.result
+    workers = list(workers)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for worker in workers:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not worker.wait(remaining):
+            raise TimeoutError()
+    return [worker.get() for worker in workers]
 
 
 UIThreadInvoker = Invoker()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""
+Fetch plus decode time of a multi-megabyte Macros_recipes like page
+from a local server, http_get vs the previous per chunk accumulation:
+    python tests/bench_http_get.py
+"""
+
+import threading
+import time
+
+from conftest import Handler, Server
+
+from freecad.extman.protocol import http
+
+ROWS = {
+    'utf-8': '{{{{MacroLink|Icon=Macro_{0}.svg|Macro_{0}|Macro Ünïcödé descripción — {0}}}}}\n',
+    'ascii': '{{{{MacroLink|Icon=Macro_{0}.svg|Macro_{0}|Macro description {0}}}}}\n',
+}
+ROUNDS = 10
+
+
+def previous_http_get(url):
+    """Body accumulated with += and decoded per 8 KB chunk"""
+
+    with http.http_pool.open(url) as f:
+        data = ''
+        while True:
+            p = f.read(8192)
+            if not p:
+                break
+            data += p.decode('utf-8')
+    return data
+
+
+def measure(fn, url):
+    fn(url)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(url)
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def main():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.routes = {}
+    server.requests = []
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    base = 'http://127.0.0.1:{0}/'.format(server.server_address[1])
+
+    try:
+        for name, row in ROWS.items():
+            text = ''.join(row.format(i) for i in range(60000))
+            body = text.encode('utf-8')
+            server.routes['/' + name] = (200, {}, body)
+            url = base + name
+            try:
+                previous, _ = measure(previous_http_get, url)
+                previous = '{0:.1f} ms'.format(previous * 1e3)
+            except UnicodeDecodeError:
+                previous = 'UnicodeDecodeError'
+            current, result = measure(lambda u: http.http_get(u, cache=False), url)
+            assert result == text
+            print('{0} {1:.1f} MB: previous {2}, http_get {3:.1f} ms'.format(
+                name, len(body) / 1e6, previous, current * 1e3))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
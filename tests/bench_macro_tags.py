@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""
+Header only macro tag parsing vs full file parsing:
+    python tests/bench_macro_tags.py
+"""
+
+import base64
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import conftest  # noqa: F401, FreeCAD and PySide stand-ins
+
+from freecad.extman.protocol.macro_tags import get_macro_tags, read_macro_tags
+
+HEADER = (
+    "# -*- coding: utf-8 -*-\n"
+    "'''Macro {0} docstring\nclass X: inside docstring\n'''\n"
+    "__Name__ = 'M{0}'\n"
+    "__Comment__ = '''multi\nline'''\n"
+    "import FreeCAD\n"
+    "try:\n    from PySide import QtGui\nexcept ImportError:\n    pass\n"
+    "__Version__ = '1.{0}'\n"
+    "__Author__ = \"A\"\n"
+    "__Files__ = 'a.py, b.py'\n"
+)
+
+CODE = ''.join("def f{0}(x):\n    return x * {0}\n\n".format(i) for i in range(400))
+
+
+def create_macros(path, count=400):
+    random.seed(1)
+    for i in range(count):
+        blob = base64.b64encode(random.randbytes(random.choice([0, 0, 0, 300000]))).decode()
+        text = HEADER.format(i) + "ICON = '{0}'\n".format(blob) + CODE
+        if i % 10 == 9:
+            text += "__Web__ = 'https://example.org/{0}'\n".format(i)  # Tag after the code
+        Path(path, 'M{0}.FCMacro'.format(i)).write_text(text, encoding='utf-8')
+    return sorted(Path(path).iterdir())
+
+
+def read_full(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return get_macro_tags(f.read(), path)
+
+
+def measure(fn, paths):
+    start = time.perf_counter()
+    result = [fn(p) for p in paths]
+    return time.perf_counter() - start, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = create_macros(tmp)
+        size = sum(p.stat().st_size for p in paths) / 1e6
+        for fn in (read_full, read_macro_tags):  # Warm up the page cache
+            measure(fn, paths)
+        full, expected = measure(read_full, paths)
+        header, result = measure(read_macro_tags, paths)
+        assert result == expected
+        print('{0} macros, {1:.1f} MB: full {2:.3f}s, header {3:.3f}s'.format(len(paths), size, full, header))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+
+"""
+Memory and (de)serialization time of a synthetic 5,000 packages catalogue:
+    python tests/bench_package_info.py
+"""
+
+import gc
+import time
+import tracemalloc
+
+import conftest  # noqa: F401, FreeCAD and PySide stand-ins
+
+from freecad.extman.sources import PackageInfo
+
+PACKAGES = 5000
+
+
+class DictPackageInfo:
+    """Baseline: same fields in a per instance __dict__"""
+
+    def __init__(self, **kw):
+        for k, v in PackageInfo().toSerializable().items():
+            setattr(self, k, v)
+        for k, v in kw.items():
+            setattr(self, k, v)
+
+
+def create_records(count=PACKAGES, extra=False):
+    records = [dict(
+        key='k{0}'.format(i),
+        name='pkg{0}'.format(i),
+        title='Package {0}'.format(i),
+        description='Description of package {0}'.format(i),
+        categories=['Category{0}'.format(i % 12)],
+        type='Workbench',
+        installDir='/home/user/.FreeCAD/Mod/pkg{0}'.format(i),
+        icon='https://example.org/icons/{0}.svg'.format(i),
+        iconSources=['https://example.org/a{0}.svg'.format(i), 'https://example.org/b.svg'],
+        git='https://github.com/example/pkg{0}'.format(i),
+        isGit=True,
+        readmeUrl='https://example.org/readme/{0}'.format(i),
+        channelId='FreeCAD',
+        sourceName='Addons',
+    ) for i in range(count)]
+    if extra:
+        for r in records:
+            r['comment'] = 'Unknown manifest field'
+    return records
+
+
+def measure_memory(factory, records):
+    gc.collect()
+    tracemalloc.start()
+    packages = [factory(dict(r)) for r in records]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, packages
+
+
+def main():
+    for extra in (False, True):
+        records = create_records(extra=extra)
+
+        baseline, _ = measure_memory(lambda r: DictPackageInfo(**r), records)
+        slotted, packages = measure_memory(PackageInfo.fromSerializable, records)
+
+        start = time.perf_counter()
+        for r in records:
+            PackageInfo.fromSerializable(dict(r))
+        from_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        serialized = [pkg.toSerializable() for pkg in packages]
+        to_time = time.perf_counter() - start
+
+        assert all(serialized[0][k] == v for k, v in records[0].items())
+        print('{0} packages{1}: __dict__ {2:.2f} MB, slots {3:.2f} MB, '
+              'fromSerializable {4:.1f} ms, toSerializable {5:.1f} ms'.format(
+                len(records), ' with an extra field' if extra else '',
+                baseline / 1e6, slotted / 1e6, from_time * 1e3, to_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
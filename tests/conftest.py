@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+FreeCAD and PySide are only available inside FreeCAD, minimal stand-ins
+are installed before freecad.extman is imported.
+"""
+
+import http.server
+import socket
+import socketserver
+import ssl
+import sys
+import tempfile
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+APP_DATA = Path(tempfile.mkdtemp(prefix='extman-tests-'))
+
+
+class _Console:
+
+    def PrintLog(self, msg):
+        pass
+
+    PrintMessage = PrintWarning = PrintError = PrintLog
+
+
+class _ParamGroup:
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    GetString = GetBool = GetInt = GetFloat = get
+    SetString = SetBool = SetInt = SetFloat = set
+
+
+_param_groups = {}
+
+
+class _QtMeta(type):
+
+    def __getattr__(cls, name):
+        return cls
+
+
+class _Qt(metaclass=_QtMeta):
+    """Any Qt class, attribute or call"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+
+class _QApplication(_Qt):
+
+    @staticmethod
+    def translate(context, text, *args):
+        return text
+
+
+def _install_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__getattr__ = lambda attr: _Qt
+    sys.modules[name] = module
+    return module
+
+
+_install_module(
+    'FreeCAD',
+    Console=_Console(),
+    Version=lambda: ['0', '19', '0'],
+    getHomePath=lambda: str(APP_DATA / 'home'),
+    getResourceDir=lambda: str(APP_DATA / 'resources'),
+    getUserAppDataDir=lambda: str(APP_DATA / 'data'),
+    getUserMacroDir=lambda *args: str(APP_DATA / 'macro'),
+    ParamGet=lambda path: _param_groups.setdefault(path, _ParamGroup()),
+    listWorkbenches=lambda: {})
+_install_module('FreeCADGui', addLanguagePath=lambda path: None, updateLocale=lambda: None)
+_pyside = _install_module('PySide')
+_pyside.QtCore = _install_module('PySide.QtCore')
+_pyside.QtGui = _install_module('PySide.QtGui', QApplication=_QApplication)
+
+
+@pytest.fixture
+def preferences():
+    """ExtManParameters restored after the test"""
+
+    from freecad.extman.utils.preferences import ExtManParameters
+    group = _param_groups.setdefault('User parameter:BaseApp/Preferences/ExtMan', _ParamGroup())
+    saved = dict(group.values)
+    yield ExtManParameters
+    group.values = saved
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Local HTTP/1.1 server, routes are set per test in server.routes:
+    path -> (status, headers, body) or callable(handler)
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is None:
+            route = (404, {}, b'not found')
+        if callable(route):
+            route = route(self)
+            if route is None:
+                return
+        status, headers, body = route
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class Server(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients closing unread responses
+
+
+@pytest.fixture
+def http_server():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.routes = {}
+    server.requests = []
+    server.url = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+TEST_CERT = Path(__file__).parent / 'data' / 'test_server.crt'
+TEST_KEY = Path(__file__).parent / 'data' / 'test_server.key'
+
+
+@pytest.fixture
+def https_server():
+    """Same as http_server over TLS, certificate valid for secure.test"""
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(TEST_CERT), str(TEST_KEY))
+    server = Server(('127.0.0.1', 0), Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    server.routes = {}
+    server.requests = []
+    server.port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class ConnectHandler(socketserver.StreamRequestHandler):
+    """
+    CONNECT only proxy: every tunnel goes to server.target (host, port)
+    """
+
+    def handle(self):
+        request_line = self.rfile.readline().decode('latin-1').strip()
+        headers = {}
+        for line in iter(self.rfile.readline, b'\r\n'):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip()] = value.strip()
+        self.server.tunnels.append((request_line, headers))
+        if not request_line.startswith('CONNECT '):
+            self.wfile.write(b'HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n')
+            return
+        upstream = socket.create_connection(self.server.target)
+        self.wfile.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+        self.wfile.flush()
+        pipes = [threading.Thread(target=self.pipe, args=(self.connection, upstream), daemon=True),
+                 threading.Thread(target=self.pipe, args=(upstream, self.connection), daemon=True)]
+        for pipe in pipes:
+            pipe.start()
+        for pipe in pipes:
+            pipe.join()
+
+    @staticmethod
+    def pipe(source, target):
+        try:
+            for chunk in iter(lambda: source.recv(65536), b''):
+                target.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            try:
+                target.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def connect_proxy(https_server):
+    """CONNECT proxy tunneling every target to https_server"""
+
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), ConnectHandler)
+    server.daemon_threads = True
+    server.target = ('127.0.0.1', https_server.port)
+    server.tunnels = []
+    server.url = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
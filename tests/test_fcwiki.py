@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import json
+import time
+from pathlib import Path
+
+from freecad.extman.protocol.fcwiki import parse_mod_index
+
+DATA = Path(__file__).parent / 'data'
+WIKI = 'https://wiki.freecad.org'
+
+
+def test_mod_index_golden():
+    """
+    Golden rows come from the previous MOD_TABLE_ITEM regex, with values
+    stripped and without the table end (|}) captured as flag.
+    """
+
+    wikitext = (DATA / 'External_workbenches.wiki').read_text(encoding='utf-8')
+    golden = json.loads((DATA / 'External_workbenches.golden.json').read_text(encoding='utf-8'))
+
+    index = parse_mod_index(wikitext, WIKI)
+
+    assert list(index.values()) == golden
+    assert list(index) == [row['repo'] for row in golden]
+
+
+def test_mod_index_inline_cells():
+    wikitext = '{|\n|-\n|[[File:X wb.svg|32px]] || [[X_Workbench|X]] || Part || Desc || me || https://x.org/x/ || Doc\n|}'
+
+    assert parse_mod_index(wikitext, WIKI) == {
+        'https://x.org/x': {
+            'name': 'X_Workbench',
+            'title': 'X',
+            'description': 'Desc',
+            'categories': 'Part',
+            'author': 'me',
+            'repo': 'https://x.org/x',
+            'flag': None,
+            'icon': WIKI + '/Special:Redirect/file/X_wb.svg'
+        }
+    }
+
+
+def test_mod_index_skips_incomplete_rows():
+    wikitext = '\n'.join([
+        '{|',
+        '|-', '|', '|[[Short]]', '|Part', '|Only four cells',
+        '|-', '|', '|no link', '|Part', '|Desc', '|me', '|https://x.org/nolink', '|Doc',
+        '|-', '|', '|[[Ok]]', '|Part', '|Desc', '|me', '|https://x.org/ok', '|Doc',
+        '|}'])
+
+    assert list(parse_mod_index(wikitext, WIKI)) == ['https://x.org/ok']
+
+
+def test_mod_index_malformed_rows_are_linear():
+    # Unterminated links made the previous regex backtrack for seconds
+    row = '|-\n|[[File:' + 'x|' * 3000 + '\n|[[' + 'y|' * 3000 + '\n' + '|\n' * 3000
+    wikitext = '{|\n' + row * 20 + '|}\n'
+
+    start = time.perf_counter()
+    index = parse_mod_index(wikitext, WIKI)
+
+    assert index == {}
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+import http.client as http_client
+import ssl
+import threading
+import time
+
+import pytest
+from conftest import TEST_CERT
+
+from freecad.extman.protocol import http
+from freecad.extman.protocol.http import HttpPool, HttpError
+
+
+def get(pool, url, **kwargs):
+    with pool.open(url, **kwargs) as f:
+        return f.status, f.read()
+
+
+def test_connections_are_reused(http_server):
+    http_server.routes['/a'] = (200, {}, b'A')
+    http_server.routes['/b'] = (200, {}, b'B')
+    pool = HttpPool()
+
+    assert get(pool, http_server.url + '/a') == (200, b'A')
+    assert get(pool, http_server.url + '/b') == (200, b'B')
+    assert get(pool, http_server.url + '/a') == (200, b'A')
+
+    stats = pool.stats()
+    assert stats['requests'] == 3
+    assert stats['connectionsCreated'] == 1
+    assert stats['connectionsReused'] == 2
+    assert stats['idle'] == {http_server.url: 1}
+
+
+def test_unread_response_is_not_reused(http_server):
+    http_server.routes['/big'] = (200, {}, b'x' * 100000)
+    pool = HttpPool()
+
+    with pool.open(http_server.url + '/big') as f:
+        f.read(10)
+    get(pool, http_server.url + '/big')
+
+    assert pool.stats()['connectionsCreated'] == 2
+
+
+def test_stale_connection_is_retried(http_server):
+    def close_after_reply(handler):
+        handler.close_connection = True  # Without telling the client
+        return 200, {}, b'ok'
+
+    http_server.routes['/close'] = close_after_reply
+    pool = HttpPool()
+
+    assert get(pool, http_server.url + '/close') == (200, b'ok')
+    assert get(pool, http_server.url + '/close') == (200, b'ok')
+
+    stats = pool.stats()
+    assert stats['retries'] == 1
+    assert stats['connectionsCreated'] == 2
+
+
+def test_redirects_are_followed(http_server):
+    http_server.routes['/old'] = (301, {'Location': '/moved'}, b'')
+    http_server.routes['/moved'] = (302, {'Location': http_server.url + '/new?x=1'}, b'')
+    http_server.routes['/new'] = (200, {}, b'new')
+    pool = HttpPool()
+
+    with pool.open(http_server.url + '/old') as f:
+        assert f.read() == b'new'
+        assert f.url == http_server.url + '/new?x=1'
+
+    stats = pool.stats()
+    assert stats['redirects'] == 2
+    assert stats['connectionsCreated'] == 1
+
+
+def test_redirect_loop_is_an_error(http_server):
+    http_server.routes['/loop'] = (302, {'Location': '/loop'}, b'')
+    pool = HttpPool(max_redirects=3)
+
+    with pytest.raises(HttpError) as error:
+        pool.open(http_server.url + '/loop')
+
+    assert error.value.status == 310
+    assert pool.stats()['errors'] == 1
+
+
+def test_http_errors_raise(http_server):
+    pool = HttpPool()
+
+    with pytest.raises(HttpError) as error:
+        pool.open(http_server.url + '/missing')
+
+    assert error.value.status == 404
+    assert pool.stats()['errors'] == 1
+
+
+def test_user_proxy_with_credentials(http_server, preferences):
+    http_server.routes['http://example.test/file.txt'] = (200, {}, b'proxied')
+    preferences.ProxyCheck = 'user'
+    preferences.ProxyUrl = 'http://user:secret@' + http_server.url.split('://')[1]
+    pool = HttpPool()
+
+    assert get(pool, 'http://example.test/file.txt') == (200, b'proxied')
+    assert get(pool, 'http://example.test/file.txt') == (200, b'proxied')
+
+    method, path, headers = http_server.requests[0]
+    assert path == 'http://example.test/file.txt'
+    assert headers['Proxy-Authorization'] == 'Basic dXNlcjpzZWNyZXQ='
+    assert headers['Host'] == 'example.test'
+    assert pool.stats()['connectionsReused'] == 1
+
+
+def test_host_concurrency_is_limited(http_server, preferences):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow(handler):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return 200, {}, b'slow'
+
+    http_server.routes['/slow'] = slow
+    preferences.HttpHostConcurrency = 2
+    pool = HttpPool()
+
+    threads = [threading.Thread(target=get, args=(pool, http_server.url + '/slow')) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    stats = pool.stats()
+    assert max(peak) == 2
+    assert stats['requests'] == 6
+    assert stats['hostWaits'] >= 1
+    assert stats['connectionsCreated'] == 2
+
+
+def test_host_slot_is_released_on_errors(http_server, preferences):
+    http_server.routes['/ok'] = (200, {}, b'ok')
+    preferences.HttpHostConcurrency = 1
+    pool = HttpPool()
+
+    for _ in range(3):
+        with pytest.raises(HttpError):
+            pool.open(http_server.url + '/missing')
+    assert get(pool, http_server.url + '/ok') == (200, b'ok')
+    assert pool.stats()['hostWaits'] == 0
+
+
+def test_http_get_retries_lost_cache_body_without_deadlock(http_server, preferences, monkeypatch):
+    http_server.routes['/cached'] = lambda handler: (
+        (304, {'ETag': '"1"'}, b'') if handler.headers.get('If-None-Match') == '"1"'
+        else (200, {'ETag': '"1"'}, b'body'))
+    preferences.HttpHostConcurrency = 1
+    url = http_server.url + '/cached'
+
+    assert http.http_get(url) == 'body'
+
+    # Body lost between the validators lookup and the 304
+    monkeypatch.setattr(http.http_cache, 'read', lambda u: None)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(http.http_get(url)), daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert result == ['body']
+
+
+def test_https_through_connect_proxy(https_server, connect_proxy, preferences, monkeypatch):
+    https_server.routes['/secure.txt'] = (200, {}, b'secure')
+    preferences.ProxyCheck = 'user'
+    preferences.ProxyUrl = 'http://user:secret@' + connect_proxy.url.split('://')[1]
+    context = ssl.create_default_context(cafile=str(TEST_CERT))
+    monkeypatch.setattr(http, 'ssl_ctx', context)
+    pool = HttpPool()
+
+    conn = pool.connect('https', 'secure.test', 443, preferences.ProxyUrl, 5)
+    assert isinstance(conn, http_client.HTTPSConnection)
+    conn.close()
+
+    assert get(pool, 'https://secure.test/secure.txt') == (200, b'secure')
+    assert get(pool, 'https://secure.test/secure.txt') == (200, b'secure')
+
+    request_line, headers = connect_proxy.tunnels[0]
+    assert request_line == 'CONNECT secure.test:443 HTTP/1.0'
+    assert headers['Proxy-Authorization'] == 'Basic dXNlcjpzZWNyZXQ='
+    assert len(connect_proxy.tunnels) == 1
+    assert https_server.requests[0][1] == '/secure.txt'
+    assert https_server.requests[0][2]['Host'] == 'secure.test'
+
+
+def test_http_get_decodes_utf8_split_across_chunks(http_server):
+    text = 'Macro Ünïcödé descripción — ' * 5000
+    body = text.encode('utf-8')
+    size = 8191  # Odd size: multibyte characters straddle chunks
+    assert any(body[i] & 0xC0 == 0x80 for i in range(size, len(body), size))
+
+    def chunked(handler):
+        handler.send_response(200)
+        handler.send_header('Transfer-Encoding', 'chunked')
+        handler.end_headers()
+        for i in range(0, len(body), size):
+            chunk = body[i:i + size]
+            handler.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            handler.wfile.flush()
+        handler.wfile.write(b'0\r\n\r\n')
+
+    http_server.routes['/chunked'] = chunked
+    http_server.routes['/length'] = (200, {}, body)
+
+    assert http.http_get(http_server.url + '/chunked', cache=False) == text
+    assert http.http_get(http_server.url + '/length', cache=False) == text
+    assert http.http_get(http_server.url + '/chunked', decode=None, cache=False) == body
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+
+import subprocess
+import sys
+
+import pytest
+
+from freecad.extman.protocol import macro_tags
+from freecad.extman.protocol.macro_tags import get_macro_tags, read_macro_tags
+
+MACROS = {
+    'header_only': (
+        "# -*- coding: utf-8 -*-\n"
+        "'''Docstring\nclass X: inside docstring\n'''\n"
+        "__Name__ = 'Foo'\n"
+        "__Comment__ = '''multi\nline'''\n"
+        "import FreeCAD\n"
+        "try:\n    from PySide import QtGui\nexcept ImportError:\n    pass\n"
+        "__Version__ = \"1.2\"\n"
+        "def run():\n    pass\n"
+    ),
+    'simple_assignment': (
+        "__Name__='Foo'\n"
+        "VERSION='1.2'\n"
+        "__Version__='1.2'\n"
+        "__Files__='a.svg'\n"
+    ),
+    'if_block': (
+        "__Name__ = 'Foo'\n"
+        "if True:\n    import os\n"
+        "__Author__ = 'Someone'\n"
+    ),
+    'multiline_dict': (
+        "__Name__ = 'Foo'\n"
+        "ICONS = {\n"
+        "'a': 'a.svg',\n"
+        "}\n"
+        "__Icon__ = 'a.svg'\n"
+    ),
+    'tags_after_code': (
+        "import FreeCAD\n"
+        "def run():\n    pass\n"
+        "__Name__ = 'Foo'\n"
+        "__Web__ = 'https://example.org'\n"
+    ),
+    'indented_tags': (
+        "__Name__ = 'Foo'\n"
+        "class Macro:\n"
+        "    __Version__ = '3.0'\n"
+    ),
+    'no_tags': (
+        "import FreeCAD\n"
+        "print('hello')\n"
+    ),
+}
+
+
+@pytest.mark.parametrize('name', sorted(MACROS))
+def test_read_macro_tags_same_as_full_parse(name, tmp_path):
+    path = tmp_path / (name + '.FCMacro')
+    path.write_text(MACROS[name], encoding='utf-8')
+    assert read_macro_tags(path) == get_macro_tags(MACROS[name], path)
+
+
+def test_read_macro_tags_after_simple_assignment(tmp_path):
+    path = tmp_path / 'Foo.FCMacro'
+    path.write_text(MACROS['simple_assignment'], encoding='utf-8')
+    tags = read_macro_tags(path)
+    assert (tags['name'], tags['version'], tags['files']) == ('Foo', '1.2', 'a.svg')
+
+
+def test_read_macro_tags_undecodable(tmp_path):
+    path = tmp_path / 'Bad.FCMacro'
+    path.write_bytes(b"__Name__ = '\xff\xfe'\n")
+    assert read_macro_tags(path) is None
+
+
+def test_macro_tags_only_needs_stdlib():
+    """Worker processes load this module, it must not pull FreeCAD or Qt"""
+
+    script = (
+        "import importlib.util, sys\n"
+        "spec = importlib.util.spec_from_file_location('macro_tags', sys.argv[1])\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        "assert not {'FreeCAD', 'PySide', 'PySide2', 'freecad'} & set(sys.modules), sorted(sys.modules)\n"
+    )
+    subprocess.run([sys.executable, '-I', '-c', script, macro_tags.__file__], check=True)
+
+
+def test_read_macro_tags_plain_str(tmp_path):
+    path = tmp_path / 'Foo.FCMacro'
+    path.write_text("__Name__ = '<b>Foo</b>'\n", encoding='utf-8')
+    assert type(read_macro_tags(path)['name']) is str
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ***************************************************************************
+# *                                                                         *
+# *  Copyright (c) 2020 Frank Martinez <mnesarco at gmail.com>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *  This program is distributed in the hope that it will be useful,        *
+# *  but WITHOUT ANY WARRANTY; without even the implied warranty of         *
+# *  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          *
+# *  GNU General Public License for more details.                           *
+# *                                                                         *
+# *  You should have received a copy of the GNU General Public License      *
+# *  along with this program.  If not, see <https://www.gnu.org/licenses/>. *
+# *                                                                         *
+# ***************************************************************************
+
+
+import types
+from pathlib import Path
+
+import freecad.extman.utils as utils
+from freecad.extman import get_app_data_path, get_macro_path
+from freecad.extman.sources import InstallResult, PackageInfo, source_cloud
+from freecad.extman.sources.source_cloud import (
+    CloudPackageSource, compact_catalogue_record, expand_catalogue_record)
+
+
+def test_catalogue_record_relocates_all_path_forms():
+    roots = utils.get_path_placeholders()
+    mod_dir = Path(get_app_data_path(), 'Mod', 'Foo')
+    record = {
+        'name': 'Foo',
+        'installDir': str(mod_dir),
+        'installFile': str(Path(get_macro_path(), 'Foo.FCMacro')),
+        'icon': utils.path_to_url(Path(mod_dir, 'icon.svg')),
+        'readmeUrl': Path(mod_dir, 'README.md').as_uri(),
+        'iconSources': ['https://example.org/icon.svg', utils.path_to_url(Path(mod_dir, 'a.svg'))],
+        'flags': {'obsolete': False, 'icon': utils.path_to_url(Path(mod_dir, 'b.svg'))},
+    }
+    compact = compact_catalogue_record(dict(record), roots)
+
+    assert set(compact) == {'name', 'flags', '$paths', '$pathLists'}
+    assert set(compact['$paths']) == {'installDir', 'installFile', 'icon', 'readmeUrl'}
+    assert compact['$pathLists']['iconSources'][0] == 'https://example.org/icon.svg'
+    assert set(compact['flags']) == {'obsolete', '$paths'}
+    assert record['flags']['icon'] == utils.path_to_url(Path(mod_dir, 'b.svg'))
+
+    current = [root for _, root in roots]
+    assert expand_catalogue_record(compact, current) == record
+    assert '$paths' in compact and '$paths' in compact['flags']
+
+    moved = [root.replace('extman-tests', 'moved') for root in current]
+    expanded = expand_catalogue_record(compact, moved)
+    assert expanded['flags']['icon'] == record['flags']['icon'].replace('extman-tests', 'moved')
+    assert expanded['icon'] == record['icon'].replace('extman-tests', 'moved')
+
+
+def test_install_does_not_touch_the_cached_package(tmp_path, monkeypatch):
+    mod_dir = tmp_path / 'Foo'
+    mod_dir.mkdir()
+    (mod_dir / 'InitGui.py').write_text('Gui.addWorkbench(FooWorkbench())\n', encoding='utf-8')
+    pkg = PackageInfo(key='Foo', name='Foo', type='Workbench', installDir=mod_dir, categories=['Cat'])
+    saved = []
+
+    source = CloudPackageSource.__new__(CloudPackageSource)
+    source.findPackageByName = lambda name: pkg
+    source.protocol = types.SimpleNamespace(installMod=lambda p: InstallResult(ok=True))
+    monkeypatch.setattr(source_cloud, 'savePackageMetadata', saved.append)
+    monkeypatch.setattr(source_cloud, 'InstalledPackageSource', lambda: types.SimpleNamespace(
+        addInstalledPackage=lambda p: None))
+
+    assert source.install('Foo').ok
+    assert saved[0].key == 'FooWorkbench' and saved[0] is not pkg
+    assert pkg.key == 'Foo'